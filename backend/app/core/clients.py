@@ -0,0 +1,72 @@
+"""
+Per-process shared clients.
+
+Qdrant gRPC channels, Redis connection pools and thread pools must not be shared across ``fork()``.
+Clients are created lazily on first use and the cache is dropped in forked children, so a
+preloading multi-worker server (see app/server.py) gives every worker its own.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import redis
+from qdrant_client import QdrantClient
+from app.core.config import settings
+
+logger = logging.getLogger("core.clients")
+
+_lock = threading.Lock()
+_instances: Dict[str, Any] = {}
+
+
+def _reset_after_fork() -> None:
+    global _lock
+    _lock = threading.Lock()
+    _instances.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_or_create(name: str, factory: Callable[[], Any]) -> Any:
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = factory()
+    return instance
+
+
+def get_qdrant_client(prefer_grpc: bool = True) -> QdrantClient:
+    return _get_or_create(
+        f"qdrant:{'grpc' if prefer_grpc else 'http'}",
+        lambda: QdrantClient(url=str(settings.qdrant_url), api_key=settings.qdrant_api_key, prefer_grpc=prefer_grpc),
+    )
+
+
+def get_redis() -> redis.Redis:
+    return _get_or_create("redis", lambda: redis.from_url(settings.redis_url))
+
+
+def get_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    return _get_or_create(
+        f"executor:{name}",
+        lambda: ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name),
+    )
+
+
+def close_all() -> None:
+    """Releases this process's clients; called on application shutdown."""
+    with _lock:
+        instances = list(_instances.items())
+        _instances.clear()
+    for name, instance in instances:
+        try:
+            if isinstance(instance, ThreadPoolExecutor):
+                instance.shutdown(wait=False, cancel_futures=True)
+            else:
+                instance.close()
+        except Exception:
+            logger.exception("Failed to close %s", name)
@@ -0,0 +1,191 @@
+"""
+Request coalescing (singleflight) and admission control.
+
+``SingleFlight`` / ``ThreadSingleFlight`` share one in-flight upstream call between identical concurrent
+requests (double-clicks, reconnects, a class asking the same question). ``AdmissionController`` caps
+concurrent work per user and globally, queues a bounded number of requests briefly, and rejects the
+rest with ``Overloaded`` so callers get a fast 429 instead of a timeout.
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple, TypeVar
+
+logger = logging.getLogger("core.concurrency")
+
+T = TypeVar("T")
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: float, reason: str = "server is busy"):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class SingleFlight:
+    """Coalesces identical concurrent coroutines: the first caller runs ``fn``, later callers await its result.
+
+    The shared call runs as its own task, so a caller disconnecting does not cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["calls"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away
+            task.exception()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class ThreadSingleFlight:
+    """Thread-based counterpart of ``SingleFlight`` for blocking calls (e.g. query embeddings)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class AdmissionController:
+    """Per-key and global concurrency limits with a bounded, time-limited FIFO wait queue.
+
+    A ``None`` key (an anonymous caller) is only subject to the global limit.
+
+    Capacity is checked and reserved synchronously, before the first ``await``, so a burst of requests
+    arriving in the same event-loop tick cannot get past the limits or the queue bound.
+    """
+
+    def __init__(self, per_key_limit: int, global_limit: int, max_queue: int, queue_timeout: float, retry_after: float):
+        self.per_key_limit = per_key_limit
+        self.global_limit = global_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._active = 0
+        self._active_by_key: Dict[Hashable, int] = {}
+        self._waiters: Deque[Tuple[Hashable, asyncio.Future]] = deque()
+        self.stats = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"active": self._active, "waiting": len(self._waiters), **self.stats}
+
+    def _has_capacity(self, key: Optional[Hashable]) -> bool:
+        if self._active >= self.global_limit:
+            return False
+        return key is None or self._active_by_key.get(key, 0) < self.per_key_limit
+
+    def _reserve(self, key: Optional[Hashable]) -> None:
+        self._active += 1
+        if key is not None:
+            self._active_by_key[key] = self._active_by_key.get(key, 0) + 1
+        self.stats["admitted"] += 1
+
+    async def acquire(self, key: Optional[Hashable]) -> None:
+        """Takes a slot for ``key``, waiting up to ``queue_timeout``; raises ``Overloaded`` otherwise."""
+        if self._has_capacity(key):
+            self._reserve(key)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise Overloaded(self.retry_after, "request queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (key, waiter)
+        self._waiters.append(entry)
+        try:
+            await asyncio.wait([waiter], timeout=self.queue_timeout)
+        except BaseException:
+            # Cancelled while queued; give back a slot that may have been granted meanwhile
+            if waiter.done():
+                self.release(key)
+            else:
+                self._waiters.remove(entry)
+            raise
+        if not waiter.done():
+            self._waiters.remove(entry)
+            self.stats["timed_out"] += 1
+            raise Overloaded(self.retry_after, "timed out waiting for a free slot")
+
+    def release(self, key: Optional[Hashable]) -> None:
+        self._active -= 1
+        if key is not None:
+            remaining = self._active_by_key[key] - 1
+            if remaining:
+                self._active_by_key[key] = remaining
+            else:
+                del self._active_by_key[key]
+        self._grant_waiters()
+
+    def _grant_waiters(self) -> None:
+        # Oldest first; a waiter blocked by its own per-key limit does not hold up other keys
+        for entry in list(self._waiters):
+            if self._active >= self.global_limit:
+                break
+            key, waiter = entry
+            if self._has_capacity(key):
+                self._waiters.remove(entry)
+                self._reserve(key)
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, key: Optional[Hashable]):
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release(key)
@@ -2,6 +2,7 @@ from pydantic_settings import BaseSettings
 from pydantic import Field, AnyUrl
 from dotenv import load_dotenv
 import os
+from typing import Optional
 
 load_dotenv()
 
@@ -10,6 +11,10 @@ class Settings(BaseSettings):
     # Groq for chat completion
     groq_api_key: str = Field(..., env="GROQ_API_KEY")
     groq_model: str = Field("llama-3.1-70b-versatile", env="GROQ_MODEL")
+    # Faster model used when the primary model fails or its circuit is open
+    groq_fallback_model: Optional[str] = Field(None, env="GROQ_FALLBACK_MODEL")
+    # Send a second (hedged) chat request when the first has not answered within this many seconds
+    groq_hedge_after_seconds: Optional[float] = Field(None, env="GROQ_HEDGE_AFTER_SECONDS")
 
     # Google Gemini for embeddings
     google_api_key: str = Field(..., env="GOOGLE_API_KEY")
@@ -20,17 +25,63 @@ class Settings(BaseSettings):
     qdrant_url: AnyUrl = Field(..., env="QDRANT_URL")
     qdrant_api_key: str = Field(..., env="QDRANT_API_KEY")
     qdrant_collection_prefix: str = Field("ai_tutor", env="QDRANT_COLLECTION_PREFIX")
+    # Collection profile (see app/rag/profiles.py): default, scalar, binary, low_memory
+    qdrant_collection_profile: str = Field("default", env="QDRANT_COLLECTION_PROFILE")
+    # Optional overrides of the profile's HNSW / quantization parameters
+    qdrant_hnsw_m: Optional[int] = Field(None, env="QDRANT_HNSW_M")
+    qdrant_hnsw_ef_construct: Optional[int] = Field(None, env="QDRANT_HNSW_EF_CONSTRUCT")
+    qdrant_hnsw_ef: Optional[int] = Field(None, env="QDRANT_HNSW_EF")
+    qdrant_quantization_oversampling: Optional[float] = Field(None, env="QDRANT_QUANTIZATION_OVERSAMPLING")
+
+    # Retrieval: optional MMR re-ranking over fetch_factor * top_k over-fetched candidates
+    retrieval_mmr: bool = Field(False, env="RETRIEVAL_MMR")
+    retrieval_mmr_fetch_factor: int = Field(4, env="RETRIEVAL_MMR_FETCH_FACTOR")
+    retrieval_mmr_lambda: float = Field(0.5, env="RETRIEVAL_MMR_LAMBDA")
 
     # Redis
     redis_url: str = Field(..., env="REDIS_URL")
+    # Session history: sliding expiry, turns kept per session, and size above which a turn is zlib-compressed
+    session_ttl_seconds: int = Field(7 * 24 * 3600, env="SESSION_TTL_SECONDS")
+    session_max_turns: int = Field(100, env="SESSION_MAX_TURNS")
+    session_compress_min_bytes: int = Field(512, env="SESSION_COMPRESS_MIN_BYTES")
 
     # Ingest chunking
     chunk_token_size: int = Field(600, env="CHUNK_TOKEN_SIZE")
     chunk_overlap: int = Field(64, env="CHUNK_OVERLAP")
 
+    # Upstream resilience (app/core/resilience.py)
+    request_deadline_seconds: float = Field(20.0, env="REQUEST_DEADLINE_SECONDS")
+    upstream_attempt_timeout: float = Field(15.0, env="UPSTREAM_ATTEMPT_TIMEOUT")
+    upstream_max_attempts: int = Field(3, env="UPSTREAM_MAX_ATTEMPTS")
+    upstream_backoff_base: float = Field(0.5, env="UPSTREAM_BACKOFF_BASE")
+    upstream_backoff_max: float = Field(4.0, env="UPSTREAM_BACKOFF_MAX")
+    circuit_failure_threshold: int = Field(5, env="CIRCUIT_FAILURE_THRESHOLD")
+    circuit_reset_seconds: float = Field(30.0, env="CIRCUIT_RESET_SECONDS")
+
+    # Admission control: concurrent requests per email and overall, plus a short bounded wait queue.
+    # Totals for the whole server; app/server.py divides them between its workers
+    admission_per_user_limit: int = Field(4, env="ADMISSION_PER_USER_LIMIT")
+    admission_global_limit: int = Field(64, env="ADMISSION_GLOBAL_LIMIT")
+    admission_max_queue: int = Field(128, env="ADMISSION_MAX_QUEUE")
+    admission_queue_timeout: float = Field(2.0, env="ADMISSION_QUEUE_TIMEOUT")
+    admission_retry_after: float = Field(2.0, env="ADMISSION_RETRY_AFTER")
+
+    # Adaptive /chat: target end-to-end latency used when a request does not set target_latency_ms (unset = off)
+    chat_target_latency_ms: Optional[int] = Field(None, env="CHAT_TARGET_LATENCY_MS")
+
+    # Batched chat (/chat/batch)
+    chat_batch_max_questions: int = Field(50, env="CHAT_BATCH_MAX_QUESTIONS")
+    chat_batch_concurrency: int = Field(4, env="CHAT_BATCH_CONCURRENCY")
+
     # Server
     host: str = Field("0.0.0.0", env="HOST")
     port: int = Field(8000, env="PORT")
+    # Production server (python -m app.server); 0 workers means one per CPU core
+    server_workers: int = Field(0, env="SERVER_WORKERS")
+    server_preload: bool = Field(True, env="SERVER_PRELOAD")
+    server_graceful_timeout: int = Field(30, env="SERVER_GRACEFUL_TIMEOUT")
+    server_keepalive: int = Field(5, env="SERVER_KEEPALIVE")
+    server_worker_timeout: int = Field(120, env="SERVER_WORKER_TIMEOUT")
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,287 @@
+"""
+Shared resilience layer for upstream calls (Groq chat/STT/TTS).
+
+Every request gets a deadline (see ``deadline``); retries, backoff sleeps and per-attempt timeouts
+are all bounded by what is left of it. Only transient failures (timeouts, connection errors, 408/429/5xx)
+are retried, and each upstream has a circuit breaker that short-circuits calls while it is failing.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+import groq
+from app.core.config import settings
+from app.core.clients import get_executor
+
+logger = logging.getLogger("core.resilience")
+
+RETRYABLE_STATUS = {408, 409, 425, 429}
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when an upstream is short-circuited or the request deadline leaves no time to call it."""
+
+    def __init__(self, upstream: str, reason: str, retry_after: float = 1.0):
+        super().__init__(f"{upstream} unavailable: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Sets the deadline for upstream calls made in this context (threads started via copy_context inherit it)."""
+    token = _deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or ``None`` when no deadline is set."""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def attempt_timeout() -> float:
+    """Timeout for a single upstream attempt: the configured cap, shortened to the remaining deadline."""
+    remaining = time_remaining()
+    timeout = settings.upstream_attempt_timeout
+    if remaining is not None:
+        timeout = min(timeout, remaining)
+    return max(timeout, 0.1)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, UpstreamUnavailable):
+        return False
+    if isinstance(exc, (groq.APIConnectionError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS or status >= 500
+    return False
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker: closed -> open after N failures -> half-open probe after a cool-down."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._stats = {"successes": 0, "failures": 0, "short_circuited": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._stats["short_circuited"] += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._stats["successes"] += 1
+            self._consecutive_failures = 0
+            self._state = self.CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._stats["failures"] += 1
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats["opened"] += 1
+                    logger.warning("Circuit for %s opened after %d consecutive failures", self.name, self._consecutive_failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._current_state(), "consecutive_failures": self._consecutive_failures, **self._stats}
+
+
+class LatencyTracker:
+    """Rolling window of recent successful call latencies per upstream."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+
+    def record(self, upstream: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(upstream, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, upstream: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(upstream, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def snapshot(self, q: float = 0.9) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            upstreams = {name: len(samples) for name, samples in self._samples.items()}
+        return {
+            name: {"samples": count, f"p{int(q * 100)}_ms": round(self.percentile(name, q) * 1000, 1)}
+            for name, count in upstreams.items() if count
+        }
+
+
+upstream_latency = LatencyTracker()
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if upstream not in _breakers:
+            _breakers[upstream] = CircuitBreaker(
+                upstream, settings.circuit_failure_threshold, settings.circuit_reset_seconds
+            )
+        return _breakers[upstream]
+
+
+def breaker_snapshot() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
+
+
+def _invoke_hedged(upstream: str, fn: Callable, args, kwargs, hedge_after: float):
+    """Runs ``fn`` and, if it has not answered ``hedge_after`` seconds after it started, races a second copy.
+
+    Primary calls get a pool sized like the admission limit and hedges a separate small pool, so a
+    hedge never delays a primary. The hedge timer starts when the primary actually runs, so time spent
+    queued for a thread cannot trigger hedges under load.
+    """
+    started = threading.Event()
+
+    def primary():
+        started.set()
+        return fn(*args, **kwargs)
+
+    primaries = get_executor("upstream", max_workers=settings.admission_global_limit)
+    futures = [primaries.submit(contextvars.copy_context().run, primary)]
+    started.wait(timeout=time_remaining())
+    done, _ = wait(futures, timeout=hedge_after)
+    if not done:
+        logger.info("Hedging slow %s call after %.2fs", upstream, hedge_after)
+        hedges = get_executor("hedge", max_workers=8)
+        futures.append(hedges.submit(contextvars.copy_context().run, fn, *args, **kwargs))
+    error = None
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=time_remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            raise UpstreamUnavailable(upstream, "request deadline exceeded")
+        for f in done:
+            if f.exception() is None:
+                return f.result()
+            error = f.exception()
+    raise error
+
+
+def call(upstream: str,
+         fn: Callable,
+         *args,
+         attempts: Optional[int] = None,
+         fallback: Optional[Callable[[], Any]] = None,
+         hedge_after: Optional[float] = None,
+         **kwargs):
+    """Calls ``fn(*args, **kwargs)`` with deadline-bounded retries behind the ``upstream`` circuit breaker.
+
+    Non-retryable errors are raised immediately. When retries are exhausted, the deadline runs out or the
+    circuit is open, ``fallback()`` is used if given; otherwise the last error (or ``UpstreamUnavailable``)
+    is raised.
+    """
+    breaker = get_breaker(upstream)
+    attempts = attempts or settings.upstream_max_attempts
+    last_error: Optional[BaseException] = None
+
+    for attempt in range(attempts):
+        remaining = time_remaining()
+        if remaining is not None and remaining <= 0:
+            last_error = last_error or UpstreamUnavailable(upstream, "request deadline exceeded")
+            break
+        if not breaker.allow():
+            last_error = UpstreamUnavailable(upstream, "circuit open", retry_after=breaker.retry_after())
+            break
+        try:
+            started = time.monotonic()
+            if hedge_after:
+                result = _invoke_hedged(upstream, fn, args, kwargs, hedge_after)
+            else:
+                result = fn(*args, **kwargs)
+            breaker.record_success()
+            upstream_latency.record(upstream, time.monotonic() - started)
+            return result
+        except UpstreamUnavailable as e:
+            # The deadline ran out while the upstream was still working on it
+            breaker.record_failure()
+            last_error = e
+            break
+        except Exception as e:
+            last_error = e
+            if not is_retryable(e):
+                # The upstream answered; a bad request says nothing about its health
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            logger.warning("%s attempt %d/%d failed: %s", upstream, attempt + 1, attempts, e)
+
+        if attempt + 1 < attempts:
+            delay = min(settings.upstream_backoff_max, settings.upstream_backoff_base * 2 ** attempt)
+            delay *= random.uniform(0.5, 1.0)
+            remaining = time_remaining()
+            if remaining is not None and remaining <= delay:
+                break
+            time.sleep(delay)
+
+    remaining = time_remaining()
+    if fallback is not None and (remaining is None or remaining > 0):
+        logger.warning("%s failed (%s); using fallback", upstream, last_error)
+        return fallback()
+    raise last_error
@@ -1,24 +1,37 @@
 import io
 import os
+import hashlib
+import time
+import json
+import asyncio
 import tempfile
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
+from dataclasses import replace
 import re
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Query, Body
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Query, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 import uvicorn
-from qdrant_client import models, QdrantClient
+from qdrant_client import models
 
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from groq import Groq
 
 from app.core.config import settings
-from app.rag.retriever import QdrantRetriever
-from app.rag.ingest import upsert_file_bytes
+from app.core.clients import get_executor, get_qdrant_client, close_all
+from app.core.resilience import UpstreamUnavailable, deadline, breaker_snapshot, upstream_latency
+from app.core.concurrency import AdmissionController, Overloaded, SingleFlight
+from app.rag.retriever import QdrantRetriever, query_embedding_flight
+from app.rag.ingest import upsert_file_bytes, delete_document, sanitize_email_for_collection
 from app.rag.generator import generate_answer
 from app.rag.emotion import classify_emotion
+from app.rag.adaptive import (
+    AnswerPlan, LEVELS, RETRIEVAL_UPSTREAM, EMOTION_UPSTREAM, choose_plan, level_counts, record_generation,
+    trim_contexts,
+)
 from app.rag.memory import append_turn, update_summary_if_needed, get_summary
 from app.speech.tts import text_to_speech
 from app.speech.stt import transcribe_audio
@@ -35,20 +48,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    # Bounds every upstream retry/backoff made while serving this request
+    with deadline(settings.request_deadline_seconds):
+        return await call_next(request)
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, int(exc.retry_after + 0.999)))},
+    )
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": exc.reason},
+        headers={"Retry-After": str(max(1, int(exc.retry_after + 0.999)))},
+    )
+
+
+_admission = AdmissionController(
+    per_key_limit=settings.admission_per_user_limit,
+    global_limit=settings.admission_global_limit,
+    max_queue=settings.admission_max_queue,
+    queue_timeout=settings.admission_queue_timeout,
+    retry_after=settings.admission_retry_after,
+)
+_chat_flight = SingleFlight("chat")
+_tts_flight = SingleFlight("tts")
+
+
 _groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY") or getattr(settings, "groq_api_key", None))
-# Use a single, shared Qdrant client instance
-_qdrant_client = QdrantClient(url=str(settings.qdrant_url), api_key=settings.qdrant_api_key, prefer_grpc=True)
 
 
-def sanitize_email_for_collection(email: str) -> str:
-    """Sanitizes an email address to be used as a Qdrant collection name."""
-    sanitized = re.sub(r'[^a-zA-Z0-9_-]', '_', email)
-    return f"{settings.qdrant_collection_prefix}_{sanitized}"
+def _admission_key(email: Optional[str]) -> Optional[str]:
+    # Callers without an email only count against the global limit: their address is usually a
+    # proxy's or a whole classroom's NAT, so treating it as one user would throttle everyone behind it
+    return email or None
+
 
 def _collection_exists(collection_name: str) -> bool:
     """Checks if a Qdrant collection exists."""
     try:
-        collections_response = _qdrant_client.get_collections()
+        collections_response = get_qdrant_client().get_collections()
         collection_names = [c.name for c in collections_response.collections]
         return collection_name in collection_names
     except Exception as e:
@@ -64,12 +113,14 @@ async def docs_upload(email: str = Form(...), files: List[UploadFile] = File(...
     collection_name = sanitize_email_for_collection(email)
     
     try:
-        total = 0
+        totals = {"upserted_chunks": 0, "unchanged_chunks": 0, "added_chunks": 0, "deleted_chunks": 0,
+                  "failed_chunks": 0}
         for f in files:
             contents = await f.read()
             res = upsert_file_bytes(contents, f.filename, email=email, collection_name=collection_name)
-            total += res.get("upserted_chunks", 0)
-        return {"upserted_chunks": total}
+            for key in totals:
+                totals[key] += res.get(key, 0)
+        return totals
     except Exception as e:
         logger.exception("Document upload failed.")
         raise HTTPException(status_code=500, detail=str(e))
@@ -103,12 +154,29 @@ async def docs_delete(email: str = Query(...)):
         return {"deleted": False, "message": "Collection does not exist."}
 
     try:
-        _qdrant_client.delete_collection(collection_name=collection_name)
+        get_qdrant_client().delete_collection(collection_name=collection_name)
         return {"deleted": True, "collection_name": collection_name}
     except Exception as e:
         logger.exception("Docs delete failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.delete("/docs/delete-file")
+async def docs_delete_file(email: str = Query(...), file_name: str = Query(...)):
+    if not email or not file_name:
+        raise HTTPException(status_code=400, detail="Email and file_name are required.")
+
+    collection_name = sanitize_email_for_collection(email)
+
+    if not _collection_exists(collection_name):
+        return {"deleted": False, "message": "Collection does not exist."}
+
+    try:
+        deleted_chunks = delete_document(collection_name, file_name)
+        return {"deleted": deleted_chunks > 0, "file_name": file_name, "deleted_chunks": deleted_chunks}
+    except Exception as e:
+        logger.exception("Docs delete-file failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/user/has-data")
 async def user_has_data(email: str = Query(...)):
     if not email:
@@ -126,77 +194,270 @@ class ChatRequest(BaseModel):
     top_k: Optional[int] = 6
     short_answer: Optional[bool] = False
     source_documents: Optional[List[str]] = None
+    # Diversify retrieved chunks with MMR; None uses RETRIEVAL_MMR
+    mmr: Optional[bool] = None
+    # Adaptive mode: degrade top_k/context/answer length to meet this latency; None uses CHAT_TARGET_LATENCY_MS
+    target_latency_ms: Optional[int] = None
 
 
-def _build_contexts(message: str, top_k: int, include_summary: bool, session_id: Optional[str], collection_name: str, source_documents: Optional[List[str]] = None):
+class BatchQuestion(BaseModel):
+    message: str
+    source_documents: Optional[List[str]] = None
+
+
+class BatchChatRequest(BaseModel):
+    email: str
+    questions: List[BatchQuestion]
+    top_k: Optional[int] = 6
+    short_answer: Optional[bool] = False
+    # Default sources for questions that do not name their own
+    source_documents: Optional[List[str]] = None
+    mmr: Optional[bool] = None
+    # Stream NDJSON results as each question completes instead of one ordered list
+    stream: Optional[bool] = False
+
+
+def _source_filter(source_documents: List[str]) -> models.Filter:
+    return models.Filter(
+        should=[
+            models.FieldCondition(key="file_name", match=models.MatchValue(value=doc))
+            for doc in source_documents
+        ]
+    )
+
+
+def _docs_to_contexts(docs) -> List[Dict[str, Any]]:
+    return [{"id": d.id, "text": d.text, "source": d.source} for d in docs]
+
+
+def _build_contexts(message: str, top_k: int, collection_name: str, source_documents: Optional[List[str]] = None, summary: str = "", mmr: Optional[bool] = None):
     contexts = []
     
     # Only try to retrieve if the collection exists and sources are specified
     if _collection_exists(collection_name) and source_documents:
         retriever = QdrantRetriever(collection=collection_name)
-        qdrant_filter = models.Filter(
-            should=[
-                models.FieldCondition(key="file_name", match=models.MatchValue(value=doc))
-                for doc in source_documents
-            ]
-        )
-        docs = retriever.retrieve(message, top_k=top_k or 6, filter_payload=qdrant_filter)
-        contexts.extend([{"id": d.id, "text": d.text, "source": d.source} for d in docs])
+        docs = retriever.retrieve(message, top_k=top_k or 6, filter_payload=_source_filter(source_documents), mmr=mmr)
+        contexts.extend(_docs_to_contexts(docs))
 
-    if include_summary and session_id:
-        summary = get_summary(session_id) or ""
-        if summary:
-            contexts.insert(0, {"id": "session_summary", "text": summary, "source": "session_summary"})
+    if summary:
+        contexts.insert(0, {"id": "session_summary", "text": summary, "source": "session_summary"})
             
     return contexts
 
+
+def _answer_chat(message: str, plan: AnswerPlan, collection_name: str,
+                 source_documents: Optional[List[str]], summary: str, mmr: Optional[bool]) -> Dict[str, Any]:
+    """Retrieval, generation and emotion for one chat turn; shared by coalesced identical requests."""
+    started = time.monotonic()
+    contexts = _build_contexts(message, plan.top_k, collection_name, source_documents=source_documents, summary=summary, mmr=mmr)
+    upstream_latency.record(RETRIEVAL_UPSTREAM, time.monotonic() - started)
+    contexts = trim_contexts(contexts, plan.context_token_budget)
+
+    started = time.monotonic()
+    gen = generate_answer(message, contexts, max_tokens=plan.max_tokens, temperature=0.0, short_answer=plan.short_answer)
+    record_generation(time.monotonic() - started, plan.max_tokens)
+    text = gen["text"].strip()
+    emotion = "neutral"
+    if plan.classify_emotion:
+        started = time.monotonic()
+        emotion = classify_emotion(text)
+        upstream_latency.record(EMOTION_UPSTREAM, time.monotonic() - started)
+    citations = [{"id": c["id"], "source": c["source"]} for c in contexts if c.get("id") != "session_summary"]
+    return {"text": text, "emotion": emotion, "citations": citations, "degradation_level": plan.level}
+
+
+def _chat_plan(req: ChatRequest) -> AnswerPlan:
+    top_k = req.top_k or 6
+    target = req.target_latency_ms or settings.chat_target_latency_ms
+    if not target:
+        return replace(LEVELS[0], top_k=top_k, short_answer=bool(req.short_answer))
+    return choose_plan(target, top_k, bool(req.short_answer))
+
+
+def _chat_flight_key(collection_name: str, req: ChatRequest, summary: str, plan: AnswerPlan):
+    summary_digest = hashlib.sha1(summary.encode("utf-8")).hexdigest() if summary else ""
+    return (
+        collection_name, req.message, tuple(sorted(req.source_documents or [])), summary_digest, req.mmr, plan,
+    )
+
+
 @app.post("/chat")
 async def chat_endpoint(req: ChatRequest):
     if not req.email:
         raise HTTPException(status_code=400, detail="Email is required for chat.")
 
     collection_name = sanitize_email_for_collection(req.email)
-    
-    try:
-        if not _collection_exists(collection_name):
-            gen = generate_answer(req.message, [], max_tokens=100)
-            return {"session_id": req.session_id, "text": gen["text"].strip(), "emotion": "clarifying", "citations": []}
 
-        if req.session_id:
-            append_turn(req.session_id, "user", f"{req.name or 'user'}: {req.message}")
-            update_summary_if_needed(req.session_id, threshold_turns=20)
-        
-        contexts = _build_contexts(
-            req.message, 
-            req.top_k or 6, 
-            include_summary=True, 
-            session_id=req.session_id, 
-            collection_name=collection_name, 
-            source_documents=req.source_documents
+    async with _admission.admit(req.email):
+        try:
+            if not await asyncio.to_thread(_collection_exists, collection_name):
+                gen = await _chat_flight.do(
+                    (collection_name, req.message, "no_collection"),
+                    lambda: asyncio.to_thread(generate_answer, req.message, [], max_tokens=100),
+                )
+                return {"session_id": req.session_id, "text": gen["text"].strip(), "emotion": "clarifying", "citations": [], "degradation_level": 0}
+
+            summary = ""
+            if req.session_id:
+                append_turn(req.session_id, "user", f"{req.name or 'user'}: {req.message}")
+                await asyncio.to_thread(update_summary_if_needed, req.session_id, threshold_turns=20)
+                summary = get_summary(req.session_id) or ""
+
+            plan = _chat_plan(req)
+            answer = await _chat_flight.do(
+                _chat_flight_key(collection_name, req, summary, plan),
+                lambda: asyncio.to_thread(
+                    _answer_chat, req.message, plan, collection_name, req.source_documents, summary, req.mmr,
+                ),
+            )
+
+            if req.session_id:
+                append_turn(req.session_id, "assistant", answer["text"])
+
+            return {"session_id": req.session_id, **answer}
+        except UpstreamUnavailable:
+            raise
+        except Exception as e:
+            logger.exception("Chat /chat failed.")
+            raise HTTPException(status_code=500, detail=str(e))
+
+def _build_batch_contexts(req: BatchChatRequest, collection_name: str) -> List[List[Dict[str, Any]]]:
+    """Retrieves contexts for every question with one embedding call and one Qdrant batch search.
+
+    Mirrors /chat: questions without source documents get no retrieved context.
+    """
+    contexts: List[List[Dict[str, Any]]] = [[] for _ in req.questions]
+    indexed = [
+        (i, q.message, q.source_documents or req.source_documents)
+        for i, q in enumerate(req.questions)
+    ]
+    indexed = [(i, message, sources) for i, message, sources in indexed if sources]
+    if not indexed:
+        return contexts
+
+    retriever = QdrantRetriever(collection=collection_name)
+    results = retriever.retrieve_batch(
+        [message for _, message, _ in indexed],
+        top_k=req.top_k or 6,
+        filters=[_source_filter(sources) for _, _, sources in indexed],
+        mmr=req.mmr,
+    )
+    for (i, _, _), docs in zip(indexed, results):
+        contexts[i] = _docs_to_contexts(docs)
+    return contexts
+
+
+async def _answer_batch_question(index: int, message: str, contexts: List[Dict[str, Any]], max_tokens: int,
+                                 short_answer: bool, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    async with semaphore:
+        try:
+            # Each question gets its own deadline; the batch as a whole may legitimately run longer
+            with deadline(settings.request_deadline_seconds):
+                gen = await asyncio.to_thread(
+                    generate_answer, message, contexts, max_tokens=max_tokens, temperature=0.0, short_answer=short_answer
+                )
+        except Exception as e:
+            logger.exception("Chat /chat/batch failed for question %d.", index)
+            return {"index": index, "text": None, "citations": [], "error": str(e)}
+    citations = [{"id": c["id"], "source": c["source"]} for c in contexts]
+    return {"index": index, "text": gen["text"].strip(), "citations": citations}
+
+
+@app.post("/chat/batch")
+async def chat_batch_endpoint(req: BatchChatRequest):
+    if not req.email:
+        raise HTTPException(status_code=400, detail="Email is required for chat.")
+    if not req.questions:
+        raise HTTPException(status_code=400, detail="At least one question is required.")
+    if len(req.questions) > settings.chat_batch_max_questions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.chat_batch_max_questions} questions are allowed per batch.",
         )
 
-        gen = generate_answer(req.message, contexts, max_tokens=512, temperature=0.0, short_answer=bool(req.short_answer))
-        text = gen["text"].strip()
-        emotion = classify_emotion(text)
-        
-        if req.session_id:
-            append_turn(req.session_id, "assistant", text)
-            
-        citations = [{"id": c["id"], "source": c["source"]} for c in contexts if c.get("id") != "session_summary"]
-        return {"session_id": req.session_id, "text": text, "emotion": emotion, "citations": citations}
+    collection_name = sanitize_email_for_collection(req.email)
+
+    # A batch is admitted as one request: it holds one of the user's slots until its last answer is
+    # sent, and its own fan-out is bounded separately by CHAT_BATCH_CONCURRENCY
+    await _admission.acquire(req.email)
+    released = False
+
+    def release_admission():
+        nonlocal released
+        if not released:
+            released = True
+            _admission.release(req.email)
+
+    try:
+        return await _run_chat_batch(req, collection_name, release_admission)
+    except BaseException:
+        release_admission()
+        raise
+
+
+async def _run_chat_batch(req: BatchChatRequest, collection_name: str, release_admission: Callable[[], None]):
+    try:
+        has_collection = await asyncio.to_thread(_collection_exists, collection_name)
+        if has_collection:
+            batch_contexts = await asyncio.to_thread(_build_batch_contexts, req, collection_name)
+            max_tokens = 512
+        else:
+            batch_contexts = [[] for _ in req.questions]
+            max_tokens = 100
     except Exception as e:
-        logger.exception("Chat /chat failed.")
+        logger.exception("Chat /chat/batch retrieval failed.")
         raise HTTPException(status_code=500, detail=str(e))
 
+    semaphore = asyncio.Semaphore(max(1, settings.chat_batch_concurrency))
+    tasks = [
+        asyncio.create_task(_answer_batch_question(
+            i, q.message, contexts, max_tokens, bool(req.short_answer), semaphore
+        ))
+        for i, (q, contexts) in enumerate(zip(req.questions, batch_contexts))
+    ]
+
+    if req.stream:
+        def stop_batch():
+            for task in tasks:
+                task.cancel()
+            release_admission()
+
+        async def ndjson_results():
+            # The admission slot is held while answers stream and released when the stream ends
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    result = await next_done
+                    yield json.dumps(result) + "\n"
+            finally:
+                stop_batch()
+
+        async def stop_batch_after_response():
+            # Covers a response that is never iterated (client gone before the first byte); async so it
+            # runs on the event loop rather than in Starlette's threadpool
+            stop_batch()
+
+        return StreamingResponse(ndjson_results(), media_type="application/x-ndjson",
+                                 background=BackgroundTask(stop_batch_after_response))
+
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        release_admission()
+    return {"results": results}
+
+
 @app.post("/stt")
 async def stt_endpoint(file: UploadFile = File(...), email: Optional[str] = Form(None)):
-    try:
-        contents = await file.read()
-        transcript = transcribe_audio(contents)
-        return PlainTextResponse(transcript)
-    except Exception as e:
-        logger.exception("STT endpoint failed")
-        raise HTTPException(status_code=500, detail=str(e))
+    async with _admission.admit(_admission_key(email)):
+        try:
+            contents = await file.read()
+            transcript = await asyncio.to_thread(transcribe_audio, contents)
+            return PlainTextResponse(transcript)
+        except UpstreamUnavailable:
+            raise
+        except Exception as e:
+            logger.exception("STT endpoint failed")
+            raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/tts")
@@ -208,14 +469,55 @@ async def tts_endpoint(body: Dict[str, Any] = Body(...)):
     fmt = (body.get("format") or "wav").lower()
     if fmt not in ("wav", "mp3"):
         fmt = "wav"
-    try:
-        audio_stream = text_to_speech(text=text, voice=voice, response_format=fmt)
-        media_type = "audio/wav" if fmt == "wav" else "audio/mpeg"
-        return StreamingResponse(audio_stream, media_type=media_type)
-    except Exception as e:
-        logger.exception("TTS endpoint failed")
-        raise HTTPException(status_code=500, detail=str(e))
+    async with _admission.admit(_admission_key(body.get("email"))):
+        try:
+            # Groq returns the whole clip in one response, so buffering it lets identical requests share it
+            audio = await _tts_flight.do(
+                (text, voice, fmt),
+                lambda: asyncio.to_thread(lambda: b"".join(text_to_speech(text=text, voice=voice, response_format=fmt))),
+            )
+            media_type = "audio/wav" if fmt == "wav" else "audio/mpeg"
+            return StreamingResponse(iter([audio]), media_type=media_type)
+        except UpstreamUnavailable:
+            raise
+        except Exception as e:
+            logger.exception("TTS endpoint failed")
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.on_event("startup")
+async def size_blocking_pool():
+    # Blocking upstream work runs via asyncio.to_thread; the default pool (min(32, cpu + 4) threads) is
+    # smaller than the admission limit, so admitted requests would queue for a thread until their
+    # deadline expired. A batch holds one slot but runs up to CHAT_BATCH_CONCURRENCY threads.
+    workers = settings.admission_global_limit + settings.chat_batch_concurrency
+    asyncio.get_running_loop().set_default_executor(get_executor("blocking", max_workers=workers))
+
+
+@app.on_event("shutdown")
+def release_clients():
+    # Runs after in-flight requests and streams have drained
+    close_all()
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def metrics():
+    # Counters are per process: with `python -m app.server` each request reports one worker
+    return {
+        "pid": os.getpid(),
+        "circuit_breakers": breaker_snapshot(),
+        "admission": _admission.snapshot(),
+        "coalescing": {f.name: dict(f.stats) for f in (_chat_flight, _tts_flight, query_embedding_flight)},
+        "upstream_latency": upstream_latency.snapshot(),
+        "adaptive_levels": level_counts(),
+    }
 
 
 if __name__ == "__main__":
+    # Development server with auto-reload; use `python -m app.server` in production
     uvicorn.run("app.main:app", host=getattr(settings, "host", "0.0.0.0"), port=getattr(settings, "port", 8000), reload=True)
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Latency-SLO adaptive answer mode for /chat.
+
+Given a target latency, picks the richest answer plan whose predicted latency fits, using the
+p90 of recently observed upstream latencies (see ``resilience.upstream_latency``). Cheaper plans
+retrieve fewer chunks, cap the context and answer length, and skip the emotion classifier.
+
+Generation samples are recorded normalized to a full-length answer (``record_generation``), so
+latencies observed while running degraded plans do not make the next prediction look faster.
+"""
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional
+from app.core.resilience import upstream_latency
+from app.rag.ingest import ENC
+
+RETRIEVAL_UPSTREAM = "retrieval"
+# /chat generation latency scaled to a FULL_MAX_TOKENS answer, see record_generation
+GENERATION_UPSTREAM = "generation_full"
+EMOTION_UPSTREAM = "groq_emotion"
+FULL_MAX_TOKENS = 512
+SUMMARY_CONTEXT_ID = "session_summary"
+# Most of a context budget a session summary may use, so it cannot crowd out every retrieved chunk
+SUMMARY_BUDGET_SHARE = 0.25
+
+
+@dataclass(frozen=True)
+class AnswerPlan:
+    level: int
+    top_k: int
+    context_token_budget: Optional[int]
+    max_tokens: int
+    classify_emotion: bool
+    short_answer: bool
+
+
+# Level 0 is the normal /chat behaviour; each further level trades answer richness for latency
+LEVELS: List[AnswerPlan] = [
+    AnswerPlan(level=0, top_k=6, context_token_budget=None, max_tokens=FULL_MAX_TOKENS, classify_emotion=True, short_answer=False),
+    AnswerPlan(level=1, top_k=4, context_token_budget=2400, max_tokens=384, classify_emotion=True, short_answer=False),
+    AnswerPlan(level=2, top_k=3, context_token_budget=1500, max_tokens=256, classify_emotion=False, short_answer=False),
+    AnswerPlan(level=3, top_k=2, context_token_budget=900, max_tokens=160, classify_emotion=False, short_answer=True),
+]
+
+_level_counts = {plan.level: 0 for plan in LEVELS}
+_counts_lock = threading.Lock()
+
+
+def token_scale(max_tokens: int) -> float:
+    # Generation time is roughly prompt overhead plus per-token decoding; most answers stop
+    # before max_tokens, so only part of the latency scales with the cap
+    return 0.4 + 0.6 * max_tokens / FULL_MAX_TOKENS
+
+
+def record_generation(seconds: float, max_tokens: int) -> None:
+    """Records a generation latency observed with ``max_tokens``, as the equivalent full-length latency."""
+    upstream_latency.record(GENERATION_UPSTREAM, seconds / token_scale(max_tokens))
+
+
+def _predicted_seconds(plan: AnswerPlan, retrieval: float, generation: float, emotion: float) -> float:
+    return retrieval + generation * token_scale(plan.max_tokens) + (emotion if plan.classify_emotion else 0.0)
+
+
+def choose_plan(target_latency_ms: Optional[int], top_k: int, short_answer: bool) -> AnswerPlan:
+    """Returns the least degraded plan predicted to meet ``target_latency_ms`` (level 0 when no target)."""
+    plan = LEVELS[0]
+    generation = upstream_latency.percentile(GENERATION_UPSTREAM, 0.9)
+    if target_latency_ms and generation is not None:
+        retrieval = upstream_latency.percentile(RETRIEVAL_UPSTREAM, 0.9) or 0.0
+        emotion = upstream_latency.percentile(EMOTION_UPSTREAM, 0.9) or 0.0
+        plan = LEVELS[-1]
+        for candidate in LEVELS:
+            if _predicted_seconds(candidate, retrieval, generation, emotion) * 1000 <= target_latency_ms:
+                plan = candidate
+                break
+
+    with _counts_lock:
+        _level_counts[plan.level] += 1
+    # Never return more than the caller asked for
+    return replace(plan, top_k=min(top_k, plan.top_k) if plan.level else top_k,
+                   short_answer=short_answer or plan.short_answer)
+
+
+def trim_contexts(contexts: List[Dict[str, Any]], token_budget: Optional[int]) -> List[Dict[str, Any]]:
+    """Keeps contexts in order until ``token_budget`` is used.
+
+    The session summary is truncated to ``SUMMARY_BUDGET_SHARE`` of the budget, and the first retrieved
+    chunk is truncated rather than dropped, so the answer always has some retrieved material.
+    """
+    if not token_budget:
+        return contexts
+    kept: List[Dict[str, Any]] = []
+    used = 0
+    has_chunk = False
+    for ctx in contexts:
+        is_summary = ctx.get("id") == SUMMARY_CONTEXT_ID
+        limit = token_budget - used
+        if is_summary:
+            limit = min(limit, int(token_budget * SUMMARY_BUDGET_SHARE))
+        tokens = ENC.encode(ctx.get("text", ""))
+        if len(tokens) <= limit:
+            kept.append(ctx)
+            used += len(tokens)
+        elif is_summary or not has_chunk:
+            if limit > 0:
+                kept.append({**ctx, "text": ENC.decode(tokens[:limit])})
+                used += limit
+            if not is_summary:
+                break
+        else:
+            break
+        has_chunk = has_chunk or not is_summary
+    return kept
+
+
+def level_counts() -> Dict[int, int]:
+    with _counts_lock:
+        return dict(_level_counts)
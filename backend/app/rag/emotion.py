@@ -1,9 +1,11 @@
 from groq import Groq
 from app.core.config import settings
+from app.core import resilience
 import logging
 
 logger = logging.getLogger("rag.emotion")
-client = Groq(api_key=settings.groq_api_key)
+# Retries are owned by app.core.resilience, not the SDK
+client = Groq(api_key=settings.groq_api_key, max_retries=0)
 
 EMOTIONS = ["happy", "thinking", "explaining", "clarifying", "neutral", "encouraging"]
 
@@ -24,7 +26,15 @@ def classify_emotion(answer_text: str) -> str:
         {"role": "user", "content": prompt},
     ]
     try:
-        completion = client.chat.completions.create(messages=messages, model=settings.groq_model, temperature=0.0, max_completion_tokens=8)
+        # Same model as generation, so it shares the groq_chat breaker; one attempt, the label is optional
+        completion = resilience.call(
+            "groq_chat",
+            lambda: client.chat.completions.create(
+                messages=messages, model=settings.groq_model, temperature=0.0, max_completion_tokens=8,
+                timeout=resilience.attempt_timeout(),
+            ),
+            attempts=1,
+        )
         label = completion.choices[0].message.content.strip().lower()
         if label not in EMOTIONS:
             logger.warning("Received unexpected emotion label: %s", label)
@@ -1,11 +1,12 @@
 from typing import List, Dict, Any
 from groq import Groq
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import logging
 from app.core.config import settings
+from app.core import resilience
 
 logger = logging.getLogger("rag.generator")
-client = Groq(api_key=settings.groq_api_key)
+# Retries are owned by app.core.resilience, not the SDK
+client = Groq(api_key=settings.groq_api_key, max_retries=0)
 
 BASE_SYSTEM_PROMPT = """
 You are Momo, an expert AI tutor for undergraduate STEM topics. Your personality is friendly, encouraging, and knowledgeable. Your goal is to help students understand complex topics by explaining concepts clearly and concisely.
@@ -36,16 +37,28 @@ def build_messages(question: str, contexts: List[Dict[str, Any]], short_answer:
     return messages
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10), retry=retry_if_exception_type(Exception))
+def _complete(messages: List[Dict[str, str]], model: str, temperature: float, max_tokens: int):
+    return client.chat.completions.create(
+        messages=messages,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=False,
+        timeout=resilience.attempt_timeout(),
+    )
+
+
 def generate_answer(question: str, contexts: List[Dict[str, Any]], max_tokens: int = 512, temperature: float = 0.0, short_answer: bool = False) -> Dict[str, Any]:
     messages = build_messages(question, contexts, short_answer=short_answer)
+    fallback = None
+    fallback_model = settings.groq_fallback_model
+    if fallback_model and fallback_model != settings.groq_model:
+        def fallback():
+            return resilience.call("groq_chat_fallback", _complete, messages, fallback_model, temperature, max_tokens, attempts=1)
     try:
-        completion = client.chat.completions.create(
-            messages=messages,
-            model=settings.groq_model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            stream=False,
+        completion = resilience.call(
+            "groq_chat", _complete, messages, settings.groq_model, temperature, max_tokens,
+            fallback=fallback, hedge_after=settings.groq_hedge_after_seconds,
         )
         content = completion.choices[0].message.content
         return {"text": content, "raw": completion}
@@ -1,4 +1,4 @@
-from typing import List, Dict, Iterable
+from typing import List, Dict, Iterable, Tuple
 import os
 import re
 import math
@@ -10,8 +10,12 @@ from qdrant_client.http import models
 from qdrant_client.http.models import PointStruct, Distance, VectorParams, PayloadSchemaType
 import tiktoken
 import uuid
+import hashlib
 from app.core.config import settings
+from app.core.clients import get_qdrant_client
+from app.rag.profiles import create_collection
 from datetime import datetime
+from dataclasses import dataclass
 import tempfile
 import logging
 import numpy as np
@@ -26,6 +30,7 @@ except Exception as e:
     logger.error("Failed to configure Gemini client: %s", e)
 
 ENC = tiktoken.get_encoding("cl100k_base")  # token counting
+EMBED_BATCH_SIZE = 100  # texts per Gemini embed_content call
 
 
 def _read_text_from_file(path: Path) -> str:
@@ -90,7 +95,7 @@ def embed_texts(texts: Iterable[str]) -> List[List[float]]:
         return []
 
     all_embeddings = []
-    batch_size = 100
+    batch_size = EMBED_BATCH_SIZE
     for i in range(0, len(text_list), batch_size):
         batch = text_list[i:i+batch_size]
         try:
@@ -122,24 +127,33 @@ def embed_texts(texts: Iterable[str]) -> List[List[float]]:
 
 
 def _get_qdrant_client(prefer_grpc: bool = False) -> QdrantClient:
-    return QdrantClient(url=str(settings.qdrant_url), api_key=settings.qdrant_api_key, prefer_grpc=prefer_grpc)
+    return get_qdrant_client(prefer_grpc=prefer_grpc)
 
 
-def upsert_documents(paths: List[str],
-                     collection_name: str,
-                     chunk_size: int = settings.chunk_token_size,
-                     overlap: int = settings.chunk_overlap,
-                     metadata_overrides: Dict = None) -> Dict[str, int]:
-    client = _get_qdrant_client(prefer_grpc=False)
-    dim = settings.gemini_embedding_dimensionality
+def sanitize_email_for_collection(email: str) -> str:
+    """Sanitizes an email address to be used as a Qdrant collection name."""
+    sanitized = re.sub(r'[^a-zA-Z0-9_-]', '_', email)
+    return f"{settings.qdrant_collection_prefix}_{sanitized}"
+
+
+def _chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _point_id(file_name: str, chunk_hash: str) -> str:
+    # Deterministic ids make re-upserting an unchanged chunk idempotent
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{file_name}/{chunk_hash}"))
+
+
+def _file_filter(file_name: str) -> models.Filter:
+    return models.Filter(must=[models.FieldCondition(key="file_name", match=models.MatchValue(value=file_name))])
+
 
+def ensure_collection(client: QdrantClient, collection_name: str) -> None:
     try:
         client.get_collection(collection_name)
     except Exception:
-        client.recreate_collection(
-            collection_name,
-            vectors_config=VectorParams(size=dim, distance=Distance.COSINE)
-        )
+        create_collection(client, collection_name, settings.gemini_embedding_dimensionality)
 
     client.create_payload_index(
         collection_name=collection_name,
@@ -148,7 +162,142 @@ def upsert_documents(paths: List[str],
         wait=True
     )
 
-    uploaded = 0
+
+def _stored_chunk_hashes(client: QdrantClient, collection_name: str, file_name: str) -> Dict[str, List]:
+    """Maps chunk hash -> point ids for everything stored under ``file_name``.
+
+    Points ingested before chunk hashing existed have no hash and are keyed by their id, so they
+    always count as stale and get replaced on the next re-ingestion. That only applies to files that
+    were stored under their real name (e.g. by the ingest CLI): older /docs/upload requests stored
+    chunks under the random temp-file name, which never matches again; remove those documents with
+    /docs/delete-file using the name shown by /docs/list.
+    """
+    stored: Dict[str, List] = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=_file_filter(file_name),
+            limit=512,
+            offset=offset,
+            with_payload=["chunk_hash"],
+            with_vectors=False,
+        )
+        for p in points:
+            key = (p.payload or {}).get("chunk_hash") or f"legacy:{p.id}"
+            stored.setdefault(key, []).append(p.id)
+        if offset is None:
+            break
+    return stored
+
+
+@dataclass
+class ChunkDiff:
+    """What re-ingesting one document changes: chunks to embed and upsert, and stored points to delete."""
+    file_name: str
+    new_chunks: List[Tuple[str, int, str]]  # (chunk_hash, chunk_index, text)
+    stale_ids: List
+    unchanged: int
+
+
+def diff_document_chunks(client: QdrantClient, collection_name: str, file_name: str, chunks: List[str]) -> ChunkDiff:
+    """Compares ``chunks`` against the hashes stored for ``file_name`` without embedding anything."""
+    wanted: Dict[str, int] = {}
+    for idx, chunk in enumerate(chunks):
+        if chunk.strip():
+            wanted.setdefault(_chunk_hash(chunk), idx)
+
+    stored = _stored_chunk_hashes(client, collection_name, file_name)
+    new_chunks = [(h, idx, chunks[idx]) for h, idx in wanted.items() if h not in stored]
+    stale_ids = [pid for h, ids in stored.items() if h not in wanted for pid in ids]
+    return ChunkDiff(file_name, new_chunks, stale_ids, unchanged=len(wanted) - len(new_chunks))
+
+
+def build_points(file_name: str,
+                 new_chunks: List[Tuple[str, int, str]],
+                 embeddings: List[List[float]],
+                 metadata_overrides: Dict = None) -> List[PointStruct]:
+    points = []
+    for (h, idx, text), vec in zip(new_chunks, embeddings):
+        if not any(vec):
+            # Embedding failed; leave the chunk out so the next re-ingestion retries it
+            logger.warning("Skipping chunk %d of %s: embedding failed", idx, file_name)
+            continue
+        payload = {
+            "source": file_name, "file_name": file_name,
+            "chunk_index": idx, "chunk_hash": h, "text": text,
+        }
+        if metadata_overrides:
+            payload.update(metadata_overrides)
+        points.append(PointStruct(id=_point_id(file_name, h), vector=vec, payload=payload))
+    return points
+
+
+def delete_points(client: QdrantClient, collection_name: str, point_ids: List, wait: bool = True) -> None:
+    if point_ids:
+        client.delete(
+            collection_name=collection_name,
+            points_selector=models.PointIdsList(points=point_ids),
+            wait=wait,
+        )
+
+
+def sync_document_chunks(client: QdrantClient,
+                         collection_name: str,
+                         file_name: str,
+                         chunks: List[str],
+                         metadata_overrides: Dict = None,
+                         wait: bool = True) -> Dict[str, int]:
+    """Makes the points stored for ``file_name`` match ``chunks``.
+
+    Only chunks whose hash is not stored yet are embedded and upserted; stored chunks that no longer
+    appear in the document are deleted. If any new chunk fails to embed, the stale chunks are kept so
+    the document is never left with less content than before; the next re-ingestion retries both.
+    """
+    diff = diff_document_chunks(client, collection_name, file_name, chunks)
+    points = []
+    if diff.new_chunks:
+        embeddings = embed_texts([text for _, _, text in diff.new_chunks])
+        points = build_points(file_name, diff.new_chunks, embeddings, metadata_overrides)
+    failed = len(diff.new_chunks) - len(points)
+
+    if points:
+        client.upsert(collection_name=collection_name, points=points, wait=wait)
+    deleted = 0
+    if failed:
+        logger.warning("%d chunks of %s failed to embed; keeping %d stale chunks", failed, file_name, len(diff.stale_ids))
+    else:
+        delete_points(client, collection_name, diff.stale_ids, wait=wait)
+        deleted = len(diff.stale_ids)
+
+    return {
+        "unchanged_chunks": diff.unchanged,
+        "added_chunks": len(points),
+        "deleted_chunks": deleted,
+        "failed_chunks": failed,
+    }
+
+
+def delete_document(collection_name: str, file_name: str) -> int:
+    """Deletes every chunk of ``file_name`` from the collection and returns how many were removed."""
+    client = _get_qdrant_client(prefer_grpc=False)
+    flt = _file_filter(file_name)
+    count = client.count(collection_name=collection_name, count_filter=flt, exact=True).count
+    if count:
+        client.delete(collection_name=collection_name, points_selector=models.FilterSelector(filter=flt), wait=True)
+    return count
+
+
+def upsert_documents(paths: List[str],
+                     collection_name: str,
+                     chunk_size: int = settings.chunk_token_size,
+                     overlap: int = settings.chunk_overlap,
+                     metadata_overrides: Dict = None) -> Dict[str, int]:
+    """Ingests files incrementally: re-uploading a file only embeds its new or changed chunks."""
+    client = _get_qdrant_client(prefer_grpc=False)
+    ensure_collection(client, collection_name)
+
+    totals = {"unchanged_chunks": 0, "added_chunks": 0, "deleted_chunks": 0, "failed_chunks": 0}
     for path_str in paths:
         p = Path(path_str)
         if not p.exists():
@@ -158,23 +307,11 @@ def upsert_documents(paths: List[str],
         if not chunks:
             continue
 
-        embeddings = embed_texts(chunks)
-        points = []
-        for idx, (chunk, vec) in enumerate(zip(chunks, embeddings)):
-            chunk_id = str(uuid.uuid4())
-            payload = {
-                "source": p.name, "file_name": p.name,
-                "chunk_index": idx, "text": chunk,
-            }
-            if metadata_overrides:
-                payload.update(metadata_overrides)
-            points.append(PointStruct(id=chunk_id, vector=vec, payload=payload))
-
-        if points:
-            client.upsert(collection_name=collection_name, points=points)
-            uploaded += len(points)
-        
-    return {"upserted_chunks": uploaded}
+        counts = sync_document_chunks(client, collection_name, p.name, chunks, metadata_overrides=metadata_overrides)
+        for key, value in counts.items():
+            totals[key] += value
+
+    return {"upserted_chunks": totals["added_chunks"], **totals}
 
 
 def upsert_file_bytes(file_bytes: bytes,
@@ -183,21 +320,16 @@ def upsert_file_bytes(file_bytes: bytes,
                       collection_name: str,
                       chunk_size: int = settings.chunk_token_size,
                       overlap: int = settings.chunk_overlap) -> Dict[str, int]:
-    suffix = Path(filename).suffix or ".txt"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(file_bytes)
-        tmp.flush()
-        tmp_path = Path(tmp.name)
-
-    try:
+    # Keep the uploaded file name: chunks are stored and diffed under it
+    name = Path(filename or "").name or "upload.txt"
+    if not Path(name).suffix:
+        name += ".txt"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir) / name
+        tmp_path.write_bytes(file_bytes)
         metadata_overrides = {
             "email": email,
             "uploaded_at": datetime.utcnow().isoformat() + "Z"
         }
         return upsert_documents([str(tmp_path)], collection_name=collection_name, chunk_size=chunk_size, overlap=overlap, metadata_overrides=metadata_overrides)
-    finally:
-        try:
-            tmp_path.unlink()
-        except Exception:
-            logger.exception("Failed to remove temporary file %s", tmp_path)
 
@@ -1,54 +1,108 @@
-import redis
 import json
-from typing import List, Dict
+import zlib
+from typing import List, Dict, Optional
 from app.core.config import settings
+from app.core.clients import get_redis
+from app.core import resilience
 from groq import Groq
 import logging
 
 logger = logging.getLogger("rag.memory")
-r = redis.from_url(settings.redis_url, decode_responses=True)
-client = Groq(api_key=settings.groq_api_key)
+# Retries are owned by app.core.resilience, not the SDK
+client = Groq(api_key=settings.groq_api_key, max_retries=0)
 
 SUMMARY_KEY_FMT = "session:{session_id}:summary"
 HISTORY_KEY_FMT = "session:{session_id}:history"  # list
 
+# Turn encoding: one header byte followed by the UTF-8 text (zlib-compressed when FLAG_COMPRESSED is set).
+# The low bits of the header hold the role code. Header values never equal b"{", so legacy JSON entries
+# written by earlier versions are still readable.
+ROLE_CODES = {"user": 1, "assistant": 2, "system": 3}
+ROLE_NAMES = {code: role for role, code in ROLE_CODES.items()}
+FLAG_COMPRESSED = 0x80
+ROLE_MASK = 0x0F
+
 SUMMARIZE_PROMPT = """
 You are a concise summarizer. Given a conversation between a tutor and a student, produce a short summary that captures the student's current knowledge state, unanswered questions, and context necessary for future replies. Provide the summary as a short paragraph (1-3 sentences).
 CONVERSATION:
 {conversation}
 """
 
+def encode_turn(role: str, text: str) -> bytes:
+    code = ROLE_CODES.get(role)
+    if code is None:
+        # Unknown roles are rare; keep them as JSON rather than growing the header format
+        return json.dumps({"role": role, "text": text}).encode("utf-8")
+    body = text.encode("utf-8")
+    if len(body) >= settings.session_compress_min_bytes:
+        compressed = zlib.compress(body, 6)
+        if len(compressed) < len(body):
+            return bytes([code | FLAG_COMPRESSED]) + compressed
+    return bytes([code]) + body
+
+def decode_turn(raw: bytes) -> Dict:
+    if raw[:1] == b"{":
+        return json.loads(raw)
+    header, body = raw[0], raw[1:]
+    if header & FLAG_COMPRESSED:
+        body = zlib.decompress(body)
+    return {"role": ROLE_NAMES.get(header & ROLE_MASK, "unknown"), "text": body.decode("utf-8")}
+
+def _touch(pipe, session_id: str) -> None:
+    # Sliding expiry: any activity keeps the whole session alive for another TTL. Keys written before
+    # this existed never get touched again; scripts/expire_sessions.py gives them a TTL once
+    ttl = settings.session_ttl_seconds
+    pipe.expire(HISTORY_KEY_FMT.format(session_id=session_id), ttl)
+    pipe.expire(SUMMARY_KEY_FMT.format(session_id=session_id), ttl)
+
 def append_turn(session_id: str, role: str, text: str) -> None:
     key = HISTORY_KEY_FMT.format(session_id=session_id)
-    entry = {"role": role, "text": text}
-    r.rpush(key, json.dumps(entry))
-    # Optionally trim to last 50 turns
-    r.ltrim(key, -100, -1)
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.rpush(key, encode_turn(role, text))
+    pipe.ltrim(key, -settings.session_max_turns, -1)
+    _touch(pipe, session_id)
+    pipe.execute()
 
-def get_history(session_id: str) -> List[Dict]:
+def get_history(session_id: str, last_n: Optional[int] = None) -> List[Dict]:
+    """Returns the session's turns, or only the most recent ``last_n`` (fetched with a windowed LRANGE)."""
+    if last_n is not None and last_n <= 0:
+        return []
     key = HISTORY_KEY_FMT.format(session_id=session_id)
-    items = r.lrange(key, 0, -1)
-    return [json.loads(i) for i in items]
+    start = -last_n if last_n else 0
+    items = get_redis().lrange(key, start, -1)
+    return [decode_turn(i) for i in items]
 
 def get_summary(session_id: str) -> str:
     key = SUMMARY_KEY_FMT.format(session_id=session_id)
-    return r.get(key) or ""
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.get(key)
+    _touch(pipe, session_id)
+    summary = pipe.execute()[0]
+    return summary.decode("utf-8") if summary else ""
 
 def update_summary_if_needed(session_id: str, threshold_turns: int = 20):
     key = HISTORY_KEY_FMT.format(session_id=session_id)
-    length = r.llen(key)
+    length = get_redis().llen(key)
     if length < threshold_turns:
         return
-    conv = get_history(session_id)
-    text = "\n".join([f"{c['role']}: {c['text']}" for c in conv[-threshold_turns:]])
+    conv = get_history(session_id, last_n=threshold_turns)
+    text = "\n".join([f"{c['role']}: {c['text']}" for c in conv])
     prompt = SUMMARIZE_PROMPT.format(conversation=text)
     messages = [
         {"role": "system", "content": "You are a concise summarizer for conversation state."},
         {"role": "user", "content": prompt}
     ]
     try:
-        completion = client.chat.completions.create(messages=messages, model=settings.groq_model, temperature=0.0, max_completion_tokens=200)
+        # Runs before generation on the same model: share its breaker and keep to a single attempt
+        completion = resilience.call(
+            "groq_chat",
+            lambda: client.chat.completions.create(
+                messages=messages, model=settings.groq_model, temperature=0.0, max_completion_tokens=200,
+                timeout=resilience.attempt_timeout(),
+            ),
+            attempts=1,
+        )
         summary = completion.choices[0].message.content.strip()
-        r.set(SUMMARY_KEY_FMT.format(session_id=session_id), summary)
+        get_redis().set(SUMMARY_KEY_FMT.format(session_id=session_id), summary, ex=settings.session_ttl_seconds)
     except Exception as e:
         logger.exception("Failed to summarize conversation; leaving existing summary unchanged.")
@@ -0,0 +1,43 @@
+from typing import List, Sequence
+import numpy as np
+
+
+def _normalize_rows(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=-1, keepdims=True)
+    return np.divide(m, norms, out=np.zeros_like(m), where=norms > 0)
+
+
+def mmr_select(query_vec: Sequence[float],
+               doc_vecs: Sequence[Sequence[float]],
+               top_k: int,
+               lambda_mult: float = 0.5) -> List[int]:
+    """Maximal Marginal Relevance: picks ``top_k`` candidate indices balancing relevance and diversity.
+
+    Each step selects the candidate maximizing
+    ``lambda_mult * sim(query, d) - (1 - lambda_mult) * max(sim(d, selected))``;
+    ``lambda_mult=1`` is plain relevance order, lower values favour diversity. All pairwise
+    similarities come from one matrix product, so the greedy loop only does O(n) vector work per pick.
+    """
+    docs = np.asarray(doc_vecs, dtype=np.float32)
+    n = docs.shape[0] if docs.ndim == 2 else 0
+    k = min(top_k, n)
+    if k <= 0:
+        return []
+
+    docs = _normalize_rows(docs)
+    query = _normalize_rows(np.asarray(query_vec, dtype=np.float32))
+    relevance = docs @ query
+    pairwise = docs @ docs.T
+
+    selected = [int(np.argmax(relevance))]
+    max_sim = pairwise[selected[0]].copy()
+    taken = np.zeros(n, dtype=bool)
+    taken[selected[0]] = True
+    for _ in range(1, k):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_sim
+        scores[taken] = -np.inf
+        nxt = int(np.argmax(scores))
+        selected.append(nxt)
+        taken[nxt] = True
+        np.maximum(max_sim, pairwise[nxt], out=max_sim)
+    return selected
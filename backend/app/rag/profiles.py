@@ -0,0 +1,111 @@
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+import logging
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from app.core.config import settings
+
+logger = logging.getLogger("rag.profiles")
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """Storage and index layout for a user collection.
+
+    ``quantization`` is one of "none", "scalar" (int8, ~4x smaller) or "binary" (1 bit, ~32x smaller).
+    When quantized, the original float32 vectors are only used to rescore the oversampled candidates,
+    so they can live on disk (``on_disk_vectors``) while the quantized copy stays in RAM.
+
+    HNSW build parameters default to Qdrant's own values rather than ``None``: ``None`` means
+    "unchanged" to ``apply_profile``, so a migrated collection could never be reverted.
+    """
+    name: str
+    quantization: str = "none"
+    on_disk_vectors: bool = False
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_on_disk: bool = False
+    hnsw_ef: Optional[int] = None
+    rescore: bool = True
+    oversampling: Optional[float] = None
+
+
+PROFILES: Dict[str, CollectionProfile] = {
+    # Qdrant defaults: float32 vectors and HNSW graph in RAM
+    "default": CollectionProfile(name="default"),
+    "scalar": CollectionProfile(name="scalar", quantization="scalar", on_disk_vectors=True, oversampling=1.5),
+    "binary": CollectionProfile(name="binary", quantization="binary", on_disk_vectors=True, oversampling=3.0),
+    # Smallest RAM footprint: quantized vectors in RAM, originals and graph on disk, sparser graph
+    "low_memory": CollectionProfile(
+        name="low_memory", quantization="scalar", on_disk_vectors=True,
+        hnsw_m=8, hnsw_ef_construct=64, hnsw_on_disk=True, oversampling=2.0,
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> CollectionProfile:
+    """Returns the named profile (default: QDRANT_COLLECTION_PROFILE) with Settings overrides applied."""
+    name = name or settings.qdrant_collection_profile
+    if name not in PROFILES:
+        raise ValueError(f"Unknown collection profile '{name}'. Choose one of: {', '.join(PROFILES)}")
+    profile = PROFILES[name]
+    overrides = {
+        "hnsw_m": settings.qdrant_hnsw_m,
+        "hnsw_ef_construct": settings.qdrant_hnsw_ef_construct,
+        "hnsw_ef": settings.qdrant_hnsw_ef,
+        "oversampling": settings.qdrant_quantization_oversampling,
+    }
+    return replace(profile, **{k: v for k, v in overrides.items() if v is not None})
+
+
+def vectors_config(profile: CollectionProfile, dim: int) -> models.VectorParams:
+    return models.VectorParams(size=dim, distance=models.Distance.COSINE, on_disk=profile.on_disk_vectors)
+
+
+def hnsw_config(profile: CollectionProfile) -> models.HnswConfigDiff:
+    return models.HnswConfigDiff(m=profile.hnsw_m, ef_construct=profile.hnsw_ef_construct, on_disk=profile.hnsw_on_disk)
+
+
+def quantization_config(profile: CollectionProfile) -> Optional[models.QuantizationConfig]:
+    if profile.quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if profile.quantization == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    if profile.quantization != "none":
+        raise ValueError(f"Unknown quantization '{profile.quantization}'")
+    return None
+
+
+def search_params(profile: CollectionProfile) -> Optional[models.SearchParams]:
+    """Search-time parameters for a profile; ``None`` leaves Qdrant's defaults untouched."""
+    quantization = None
+    if profile.quantization != "none":
+        quantization = models.QuantizationSearchParams(rescore=profile.rescore, oversampling=profile.oversampling)
+    if quantization is None and profile.hnsw_ef is None:
+        return None
+    return models.SearchParams(hnsw_ef=profile.hnsw_ef, quantization=quantization)
+
+
+def create_collection(client: QdrantClient, collection_name: str, dim: int,
+                      profile: Optional[CollectionProfile] = None) -> None:
+    profile = profile or get_profile()
+    client.recreate_collection(
+        collection_name,
+        vectors_config=vectors_config(profile, dim),
+        hnsw_config=hnsw_config(profile),
+        quantization_config=quantization_config(profile),
+    )
+
+
+def apply_profile(client: QdrantClient, collection_name: str, profile: CollectionProfile) -> None:
+    """Migrates an existing collection to ``profile`` in place; Qdrant rebuilds indexes in the background."""
+    quantization = quantization_config(profile)
+    client.update_collection(
+        collection_name=collection_name,
+        vectors_config={"": models.VectorParamsDiff(on_disk=profile.on_disk_vectors)},
+        hnsw_config=hnsw_config(profile),
+        quantization_config=quantization if quantization is not None else models.Disabled.DISABLED,
+    )
+    logger.info("Applied collection profile '%s' to %s", profile.name, collection_name)
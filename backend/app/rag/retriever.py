@@ -1,7 +1,11 @@
 from typing import List, Dict, Any, Optional
-from qdrant_client import QdrantClient, models
+from qdrant_client import models
 from dataclasses import dataclass
 from app.core.config import settings
+from app.core.clients import get_qdrant_client
+from app.core.concurrency import ThreadSingleFlight
+from app.rag.profiles import get_profile, search_params
+from app.rag.mmr import mmr_select
 import logging
 import numpy as np
 import google.generativeai as genai
@@ -14,6 +18,9 @@ try:
 except Exception as e:
     logger.error("Failed to configure Gemini client: %s", e)
 
+# Identical queries embedded at the same moment share one Gemini call
+query_embedding_flight = ThreadSingleFlight("gemini_query_embedding")
+
 @dataclass
 class RetrievedDoc:
     id: str
@@ -25,11 +32,16 @@ class RetrievedDoc:
 
 class QdrantRetriever:
     def __init__(self, collection: str):
-        self.client = QdrantClient(url=str(settings.qdrant_url), api_key=settings.qdrant_api_key, prefer_grpc=True)
+        # One gRPC channel per process, shared by every retriever
+        self.client = get_qdrant_client()
         self.collection = collection
+        self.search_params = search_params(get_profile())
 
     def embed_query(self, query: str) -> List[float]:
         """Generates and normalizes an embedding for a single query using the Gemini API."""
+        return query_embedding_flight.do(query, lambda: self._embed_query(query))
+
+    def _embed_query(self, query: str) -> List[float]:
         try:
             result = genai.embed_content(
                 model=settings.gemini_embedding_model,
@@ -50,14 +62,33 @@ class QdrantRetriever:
             logger.error(f"Gemini query embedding failed: {e}")
             return [0.0] * settings.gemini_embedding_dimensionality
 
-    def retrieve(self, query: str, top_k: int = 8, filter_payload: Optional[models.Filter] = None) -> List[RetrievedDoc]:
-        qvec = self.embed_query(query)
-        results = self.client.search(
-            collection_name=self.collection,
-            query_vector=qvec,
-            limit=top_k,
-            query_filter=filter_payload
-        )
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embeds many queries with a single Gemini batch call (per 100 queries) and normalizes them."""
+        if not queries:
+            return []
+        dim = settings.gemini_embedding_dimensionality
+        embeddings: List[List[float]] = []
+        batch_size = 100
+        for i in range(0, len(queries), batch_size):
+            batch = queries[i:i + batch_size]
+            try:
+                result = genai.embed_content(
+                    model=settings.gemini_embedding_model,
+                    content=batch,
+                    task_type="RETRIEVAL_QUERY",
+                    output_dimensionality=dim
+                )
+                emb_np = np.asarray(result['embedding'], dtype=np.float64)
+                norms = np.linalg.norm(emb_np, axis=1, keepdims=True)
+                normalized = np.divide(emb_np, norms, out=np.zeros_like(emb_np), where=norms > 0)
+                embeddings.extend(normalized.tolist())
+            except Exception as e:
+                logger.error(f"Gemini batch query embedding failed: {e}")
+                embeddings.extend([[0.0] * dim for _ in batch])
+        return embeddings
+
+    @staticmethod
+    def _to_docs(results) -> List[RetrievedDoc]:
         docs: List[RetrievedDoc] = []
         for r in results:
             payload = r.payload or {}
@@ -70,6 +101,63 @@ class QdrantRetriever:
             ))
         return docs
 
+    @staticmethod
+    def _mmr_rerank(qvec: List[float], results, top_k: int) -> list:
+        """Re-orders over-fetched results (fetched with vectors) into a diverse top_k."""
+        candidates = [r for r in results if r.vector]
+        if len(candidates) <= top_k:
+            return candidates
+        order = mmr_select(qvec, [r.vector for r in candidates], top_k, lambda_mult=settings.retrieval_mmr_lambda)
+        return [candidates[i] for i in order]
+
+    @staticmethod
+    def _fetch_limit(top_k: int, mmr: bool) -> int:
+        return top_k * max(1, settings.retrieval_mmr_fetch_factor) if mmr else top_k
+
+    def retrieve(self, query: str, top_k: int = 8, filter_payload: Optional[models.Filter] = None,
+                 mmr: Optional[bool] = None) -> List[RetrievedDoc]:
+        """Top-k by cosine score, or with ``mmr`` (default: RETRIEVAL_MMR) a diverse top-k re-ranked by MMR."""
+        mmr = settings.retrieval_mmr if mmr is None else mmr
+        qvec = self.embed_query(query)
+        results = self.client.search(
+            collection_name=self.collection,
+            query_vector=qvec,
+            limit=self._fetch_limit(top_k, mmr),
+            query_filter=filter_payload,
+            search_params=self.search_params,
+            with_vectors=mmr
+        )
+        if mmr:
+            results = self._mmr_rerank(qvec, results, top_k)
+        return self._to_docs(results)
+
+    def retrieve_batch(self, queries: List[str], top_k: int = 8,
+                       filters: Optional[List[Optional[models.Filter]]] = None,
+                       mmr: Optional[bool] = None) -> List[List[RetrievedDoc]]:
+        """Retrieves for many queries with one embedding call and one Qdrant batch search.
+
+        ``filters`` is aligned with ``queries``; a ``None`` entry searches the whole collection.
+        """
+        mmr = settings.retrieval_mmr if mmr is None else mmr
+        if not queries:
+            return []
+        filters = filters or [None] * len(queries)
+        if len(filters) != len(queries):
+            raise ValueError("filters must be aligned with queries")
+
+        qvecs = self.embed_queries(queries)
+        requests = [
+            models.SearchRequest(
+                vector=qvec, filter=flt, limit=self._fetch_limit(top_k, mmr),
+                with_payload=True, with_vector=mmr, params=self.search_params,
+            )
+            for qvec, flt in zip(qvecs, filters)
+        ]
+        batch_results = self.client.search_batch(collection_name=self.collection, requests=requests)
+        if mmr:
+            batch_results = [self._mmr_rerank(qvec, results, top_k) for qvec, results in zip(qvecs, batch_results)]
+        return [self._to_docs(results) for results in batch_results]
+
     def list_documents(self, limit: int = 1000, batch_size: int = 50) -> List[Dict[str, Any]]:
         unique: Dict[str, Dict[str, Any]] = {}
         offset = None
@@ -0,0 +1,71 @@
+"""
+Production server: gunicorn master with uvicorn workers on uvloop + httptools.
+
+The app is imported once in the master (SERVER_PRELOAD) so read-only state such as the tiktoken
+encoder and settings is shared copy-on-write between workers. Per-process resources (Qdrant
+channels, Redis pools, executors) are created lazily after fork, see app/core/clients.py.
+On SIGTERM workers stop accepting connections and let in-flight requests and streams finish
+for up to SERVER_GRACEFUL_TIMEOUT seconds.
+
+Admission control, circuit breakers, coalescing and latency windows live in each worker process.
+The ADMISSION_* limits are configured for the whole server and split evenly between workers (see
+``split_admission_limits``); since requests are not pinned to a worker, the per-user limit is only
+approximate. /metrics reports the worker that served the request.
+
+Usage (from backend/):
+    python -m app.server
+"""
+import math
+import multiprocessing
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+from app.core.config import settings
+
+
+class TutorUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+
+class TutorServer(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+        return app
+
+
+def worker_count() -> int:
+    return settings.server_workers or multiprocessing.cpu_count()
+
+
+def split_admission_limits(workers: int) -> None:
+    """Turns the server-wide ADMISSION_* limits into per-worker limits, before the app is loaded."""
+    for name in ("admission_global_limit", "admission_per_user_limit", "admission_max_queue"):
+        total = getattr(settings, name)
+        setattr(settings, name, max(1, math.ceil(total / workers)))
+
+
+def run() -> None:
+    workers = worker_count()
+    # Workers inherit the master's settings, with or without preloading
+    split_admission_limits(workers)
+    options = {
+        "bind": f"{settings.host}:{settings.port}",
+        "workers": workers,
+        "worker_class": "app.server.TutorUvicornWorker",
+        "preload_app": settings.server_preload,
+        "graceful_timeout": settings.server_graceful_timeout,
+        "timeout": settings.server_worker_timeout,
+        "keepalive": settings.server_keepalive,
+    }
+    TutorServer(options).run()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,152 @@
+"""
+Benchmark collection profiles: RAM (measured and estimated), recall@k against exact search, and search latency.
+
+Creates one throwaway collection per profile in the configured Qdrant, fills it with the same
+synthetic clustered unit vectors, and queries it with held-out vectors. Collections are deleted
+afterwards unless --keep is given.
+
+Measured RAM is the growth of Qdrant's ``memory_resident_bytes`` gauge (from its /metrics endpoint)
+between before the collection is created and after it has been indexed and searched. It covers heap
+memory only: on-disk vectors and graphs are memory-mapped and live in the OS page cache instead.
+Run against an otherwise idle Qdrant, one profile at a time, for meaningful numbers. The estimate
+is computed from the profile's layout and is shown alongside for comparison.
+
+Usage (from backend/):
+    python -m benchmarks.bench_collection_profiles --points 20000 --queries 200 --top-k 6
+"""
+import argparse
+import statistics
+import time
+import uuid
+from typing import List, Optional
+import httpx
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from app.core.config import settings
+from app.rag.profiles import PROFILES, CollectionProfile, get_profile, vectors_config, hnsw_config, quantization_config, search_params
+
+def synthetic_vectors(n: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    # Real embeddings are clustered by topic; uniform random vectors would make quantization look worse than it is
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=n)
+    vecs = centers[labels] + 0.35 * rng.normal(size=(n, dim))
+    return (vecs / np.linalg.norm(vecs, axis=1, keepdims=True)).astype(np.float32)
+
+
+def estimated_ram_bytes(profile: CollectionProfile, n: int, dim: int) -> int:
+    ram = 0 if profile.on_disk_vectors else n * dim * 4
+    if profile.quantization == "scalar":
+        ram += n * dim
+    elif profile.quantization == "binary":
+        ram += n * dim // 8
+    if not profile.hnsw_on_disk:
+        # Layer 0 keeps up to 2*m links of 4 bytes per point; upper layers are negligible
+        ram += n * 2 * profile.hnsw_m * 4
+    return ram
+
+
+def qdrant_resident_bytes() -> Optional[int]:
+    """Reads Qdrant's resident memory gauge; ``None`` when the server does not expose it."""
+    headers = {"api-key": settings.qdrant_api_key} if settings.qdrant_api_key else {}
+    try:
+        resp = httpx.get(f"{str(settings.qdrant_url).rstrip('/')}/metrics", headers=headers, timeout=10.0)
+        resp.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    for line in resp.text.splitlines():
+        if line.startswith("memory_resident_bytes"):
+            return int(float(line.split()[-1]))
+    return None
+
+
+def wait_until_indexed(client: QdrantClient, name: str, timeout: float = 600.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if client.get_collection(name).status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(1)
+    raise TimeoutError(f"Collection {name} was not indexed within {timeout}s")
+
+
+def bench_profile(client: QdrantClient, profile: CollectionProfile, data: np.ndarray, queries: np.ndarray, top_k: int,
+                  keep: bool = False) -> dict:
+    name = f"{settings.qdrant_collection_prefix}_bench_{profile.name}_{uuid.uuid4().hex[:8]}"
+    n, dim = data.shape
+    ram_before = qdrant_resident_bytes()
+    client.recreate_collection(
+        name,
+        vectors_config=vectors_config(profile, dim),
+        hnsw_config=hnsw_config(profile),
+        quantization_config=quantization_config(profile),
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1000),
+    )
+    try:
+        t0 = time.perf_counter()
+        for start in range(0, n, 1000):
+            batch = data[start:start + 1000]
+            client.upsert(
+                collection_name=name,
+                points=models.Batch(ids=list(range(start, start + len(batch))), vectors=batch.tolist()),
+                wait=True,
+            )
+        wait_until_indexed(client, name)
+        build_s = time.perf_counter() - t0
+
+        params = search_params(profile)
+        latencies: List[float] = []
+        recalls: List[float] = []
+        for q in queries:
+            qv = q.tolist()
+            exact = client.search(name, query_vector=qv, limit=top_k, search_params=models.SearchParams(exact=True))
+            t = time.perf_counter()
+            approx = client.search(name, query_vector=qv, limit=top_k, search_params=params)
+            latencies.append((time.perf_counter() - t) * 1000)
+            truth = {p.id for p in exact}
+            recalls.append(len(truth & {p.id for p in approx}) / max(1, len(truth)))
+
+        ram_after = qdrant_resident_bytes()
+        measured = None if ram_before is None or ram_after is None else (ram_after - ram_before) / 2**20
+
+        latencies.sort()
+        return {
+            "profile": profile.name,
+            "ram_mb": measured,
+            "est_ram_mb": estimated_ram_bytes(profile, n, dim) / 2**20,
+            "recall": statistics.mean(recalls),
+            "p50_ms": latencies[len(latencies) // 2],
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+            "build_s": build_s,
+            "collection": name,
+        }
+    finally:
+        if not keep:
+            client.delete_collection(name)
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    dim = settings.gemini_embedding_dimensionality
+    data = synthetic_vectors(args.points, dim, args.clusters, rng)
+    queries = synthetic_vectors(args.queries, dim, args.clusters, rng)
+    client = QdrantClient(url=str(settings.qdrant_url), api_key=settings.qdrant_api_key, prefer_grpc=True)
+
+    print(f"{args.points} points x {dim} dims, {args.queries} queries, recall@{args.top_k}")
+    print(f"{'profile':<12}{'RAM MB':>9}{'est RAM MB':>12}{'recall':>9}{'p50 ms':>9}{'p95 ms':>9}{'build s':>9}")
+    for name in args.profiles:
+        r = bench_profile(client, get_profile(name), data, queries, args.top_k, keep=args.keep)
+        ram = "n/a" if r["ram_mb"] is None else f"{r['ram_mb']:.1f}"
+        print(f"{r['profile']:<12}{ram:>9}{r['est_ram_mb']:>12.1f}{r['recall']:>9.3f}{r['p50_ms']:>9.2f}"
+              f"{r['p95_ms']:>9.2f}{r['build_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    main(parser.parse_args())
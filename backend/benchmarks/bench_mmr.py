@@ -0,0 +1,46 @@
+"""
+Benchmark the CPU cost MMR re-ranking adds per query.
+
+Runs ``mmr_select`` on synthetic unit vectors for several over-fetch sizes and reports the
+per-query time next to a plain top-k argsort baseline. Needs only NumPy (no Qdrant or API keys).
+
+Usage (from backend/):
+    python -m benchmarks.bench_mmr --dim 768 --top-k 6 --fetch 12 24 48 96
+"""
+import argparse
+import time
+import numpy as np
+from app.rag.mmr import mmr_select
+
+
+def time_per_call(fn, repeats: int) -> float:
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t0) / repeats * 1e6
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    print(f"dim={args.dim} top_k={args.top_k} lambda={args.lambda_mult}")
+    print(f"{'fetch_k':>8}{'top-k us':>12}{'mmr us':>12}{'added us':>12}")
+    for fetch_k in args.fetch:
+        query = rng.normal(size=args.dim).astype(np.float32)
+        docs = rng.normal(size=(fetch_k, args.dim)).astype(np.float32)
+        doc_lists = docs.tolist()  # Qdrant returns vectors as Python lists
+
+        baseline = time_per_call(lambda: np.argsort(-(docs @ query))[:args.top_k], args.repeats)
+        mmr = time_per_call(lambda: mmr_select(query, doc_lists, args.top_k, args.lambda_mult), args.repeats)
+        print(f"{fetch_k:>8}{baseline:>12.1f}{mmr:>12.1f}{mmr - baseline:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--fetch", type=int, nargs="+", default=[12, 24, 48, 96])
+    parser.add_argument("--lambda-mult", type=float, default=0.5)
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
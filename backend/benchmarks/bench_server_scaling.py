@@ -0,0 +1,102 @@
+"""
+Load benchmark: throughput of the production server (app/server.py) as the worker count grows.
+
+For each worker count, starts `python -m app.server` on a free port, drives it with concurrent
+keep-alive clients for a fixed duration, then stops it with SIGTERM (exercising graceful shutdown).
+The default path (/healthz) measures the HTTP stack itself; point --path at a real endpoint to
+include upstream calls.
+
+Usage (from backend/):
+    python -m benchmarks.bench_server_scaling --workers 1 2 4 8 --clients 64 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, SERVER_WORKERS=str(workers), HOST="127.0.0.1", PORT=str(port))
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.server"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_ready(base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("server did not become ready")
+
+
+async def drive(url: str, clients: int, duration: float) -> dict:
+    counts = {"ok": 0, "errors": 0}
+    latencies = []
+    stop_at = time.perf_counter() + duration
+
+    async def client_loop(http: httpx.AsyncClient):
+        while time.perf_counter() < stop_at:
+            t = time.perf_counter()
+            try:
+                resp = await http.get(url)
+                counts["ok" if resp.status_code == 200 else "errors"] += 1
+            except httpx.HTTPError:
+                counts["errors"] += 1
+            latencies.append(time.perf_counter() - t)
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as http:
+        await asyncio.gather(*(client_loop(http) for _ in range(clients)))
+    latencies.sort()
+    return {
+        **counts,
+        "rps": counts["ok"] / duration,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+    }
+
+
+def main(args):
+    print(f"{args.clients} clients, {args.duration}s per run, GET {args.path}")
+    print(f"{'workers':>8}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'speedup':>9}")
+    baseline = None
+    for workers in args.workers:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        proc = start_server(workers, port)
+        try:
+            wait_ready(base_url)
+            result = asyncio.run(drive(base_url + args.path, args.clients, args.duration))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+        baseline = baseline or result["rps"]
+        print(f"{workers:>8}{result['rps']:>10.0f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+              f"{result['errors']:>8}{result['rps'] / baseline:>8.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cores = os.cpu_count() or 1
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, max(1, cores // 4), max(1, cores // 2), cores}))
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--path", default="/healthz")
+    main(parser.parse_args())
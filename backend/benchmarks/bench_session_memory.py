@@ -0,0 +1,87 @@
+"""
+Compare Redis memory used by the legacy JSON session layout and the compact binary layout.
+
+Simulates many sessions of alternating short student questions and long tutor answers, writes
+them under a throwaway key prefix in both layouts, and sums ``MEMORY USAGE`` per layout. Keys are
+removed afterwards. Points at REDIS_URL (or --redis-url).
+
+Usage (from backend/):
+    python -m benchmarks.bench_session_memory --sessions 2000 --turns 40
+"""
+import argparse
+import json
+import random
+import uuid
+import redis
+from app.core.config import settings
+from app.rag.memory import encode_turn, decode_turn
+
+WORDS = (
+    "energy momentum force vector integral derivative matrix eigenvalue entropy equilibrium "
+    "velocity acceleration circuit voltage current resistance function limit series convergence "
+    "probability distribution variance theorem proof example therefore because consider the a of "
+    "and to is in we this that it with for as on can which"
+).split()
+
+
+def sentence(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def simulate_session(rng: random.Random, turns: int):
+    for i in range(turns):
+        if i % 2 == 0:
+            yield "user", "student: " + sentence(rng, rng.randint(6, 25))
+        else:
+            yield "assistant", " ".join(sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(3, 14)))
+
+
+def write_layouts(client: redis.Redis, prefix: str, sessions: int, turns: int, seed: int) -> None:
+    rng = random.Random(seed)
+    pipe = client.pipeline(transaction=False)
+    for s in range(sessions):
+        for role, text in simulate_session(rng, turns):
+            pipe.rpush(f"{prefix}:legacy:{s}", json.dumps({"role": role, "text": text}))
+            pipe.rpush(f"{prefix}:compact:{s}", encode_turn(role, text))
+        if s % 100 == 99:
+            pipe.execute()
+    pipe.execute()
+
+
+def memory_usage(client: redis.Redis, pattern: str) -> int:
+    total = 0
+    for key in client.scan_iter(match=pattern, count=1000):
+        total += client.memory_usage(key, samples=0) or 0
+    return total
+
+
+def main(args):
+    client = redis.from_url(args.redis_url or settings.redis_url)
+    prefix = f"bench:sessions:{uuid.uuid4().hex[:8]}"
+    try:
+        write_layouts(client, prefix, args.sessions, args.turns, args.seed)
+        legacy = memory_usage(client, f"{prefix}:legacy:*")
+        compact = memory_usage(client, f"{prefix}:compact:*")
+
+        # Sanity check: the compact layout round-trips
+        sample = client.lrange(f"{prefix}:compact:0", 0, -1)
+        expected = [json.loads(i) for i in client.lrange(f"{prefix}:legacy:0", 0, -1)]
+        assert [decode_turn(i) for i in sample] == expected
+
+        print(f"{args.sessions} sessions x {args.turns} turns")
+        print(f"{'layout':<10}{'total MB':>10}{'per session KB':>16}")
+        for name, total in (("legacy", legacy), ("compact", compact)):
+            print(f"{name:<10}{total / 2**20:>10.2f}{total / args.sessions / 1024:>16.2f}")
+        print(f"compact uses {compact / legacy:.0%} of legacy")
+    finally:
+        for key in client.scan_iter(match=f"{prefix}:*", count=1000):
+            client.delete(key)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--redis-url", default=None)
+    main(parser.parse_args())
@@ -0,0 +1,53 @@
+"""
+Apply a collection profile (see app/rag/profiles.py) to existing user collections.
+
+Usage (from backend/):
+    python -m scripts.apply_collection_profile --profile scalar --all
+    python -m scripts.apply_collection_profile --profile low_memory --collection ai_tutor_jane_example_com
+"""
+import argparse
+import logging
+import sys
+from qdrant_client import QdrantClient
+from app.core.config import settings
+from app.rag.profiles import PROFILES, get_profile, apply_profile
+
+logger = logging.getLogger("scripts.apply_collection_profile")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default=settings.qdrant_collection_profile, choices=sorted(PROFILES))
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--collection", action="append", help="Collection to migrate (repeatable)")
+    target.add_argument("--all", action="store_true", help=f"Migrate every '{settings.qdrant_collection_prefix}_*' collection")
+    parser.add_argument("--dry-run", action="store_true", help="List the collections that would be migrated")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    client = QdrantClient(url=str(settings.qdrant_url), api_key=settings.qdrant_api_key)
+    profile = get_profile(args.profile)
+
+    if args.all:
+        prefix = f"{settings.qdrant_collection_prefix}_"
+        names = [c.name for c in client.get_collections().collections if c.name.startswith(prefix)]
+    else:
+        names = args.collection
+
+    failed = 0
+    for name in names:
+        if args.dry_run:
+            print(f"would apply '{profile.name}' to {name}")
+            continue
+        try:
+            apply_profile(client, name, profile)
+        except Exception:
+            logger.exception("Failed to apply profile to %s", name)
+            failed += 1
+
+    print(f"{len(names) - failed}/{len(names)} collections {'selected' if args.dry_run else 'updated'} with profile '{profile.name}'")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
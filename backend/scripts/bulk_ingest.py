@@ -0,0 +1,195 @@
+"""
+Bulk-ingest a directory tree or zip archive of course material into a user's collection.
+
+Files are parsed and chunked in a process pool; new chunks are embedded across files in full Gemini
+batches and upserted in large batches with wait=False. A file's stale chunks are deleted, and the file
+is recorded in a checkpoint, only once all of its new chunks were upserted, so re-running the same
+command after an interruption (or embedding failures) skips finished files and retries the rest.
+Ingestion is incremental (see app/rag/ingest.py), so re-sending a file only embeds changed chunks.
+
+Usage (from backend/):
+    python -m scripts.bulk_ingest ./course-material --email jane@example.com
+    python -m scripts.bulk_ingest lectures.zip --collection ai_tutor_physics101 --workers 8
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+from app.core.config import settings
+from app.rag.ingest import (
+    EMBED_BATCH_SIZE, ChunkDiff, _get_qdrant_client, _read_text_from_file, build_points, chunk_text,
+    delete_points, diff_document_chunks, embed_texts, ensure_collection, sanitize_email_for_collection,
+)
+
+logger = logging.getLogger("scripts.bulk_ingest")
+
+SUPPORTED_SUFFIXES = {".pdf", ".md", ".txt"}
+
+
+def _parse_file(path: str, file_name: str, chunk_size: int, overlap: int) -> Tuple[str, List[str]]:
+    """Process-pool worker: read and chunk one file."""
+    return file_name, chunk_text(_read_text_from_file(Path(path)), chunk_size=chunk_size, overlap=overlap)
+
+
+def collect_files(root: Path, staging_dir: str) -> List[Tuple[str, str, str]]:
+    """Returns (path on disk, stored file name, fingerprint) for every supported file under ``root``.
+
+    The stored file name is the path relative to the directory/archive root, so same-named files in
+    different folders do not overwrite each other.
+    """
+    files = []
+    if root.is_file() and zipfile.is_zipfile(root):
+        with zipfile.ZipFile(root) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or Path(info.filename).suffix.lower() not in SUPPORTED_SUFFIXES:
+                    continue
+                extracted = zf.extract(info, staging_dir)
+                files.append((extracted, Path(info.filename).as_posix(), f"{info.file_size}:{info.CRC}"))
+    elif root.is_dir():
+        for p in sorted(root.rglob("*")):
+            if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES:
+                st = p.stat()
+                files.append((str(p), p.relative_to(root).as_posix(), f"{st.st_size}:{st.st_mtime_ns}"))
+    else:
+        raise ValueError(f"{root} is neither a directory nor a zip archive")
+    return files
+
+
+def load_checkpoint(path: Path) -> Set[Tuple[str, str]]:
+    done = set()
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                done.add((entry["file"], entry["fingerprint"]))
+    return done
+
+
+class BulkIngester:
+    def __init__(self, collection_name: str, checkpoint_path: Path, batch_points: int, metadata: Dict):
+        self.client = _get_qdrant_client(prefer_grpc=False)
+        self.collection_name = collection_name
+        self.batch_points = batch_points
+        self.metadata = metadata
+        self.checkpoint = checkpoint_path.open("a", encoding="utf-8")
+        # New chunks waiting to be embedded, and the files they belong to (a file never spans two flushes)
+        self.pending: List[Tuple[str, Tuple[str, int, str]]] = []
+        self.pending_files: List[Tuple[str, str, ChunkDiff]] = []
+        self.stats = {"files": 0, "failed_files": 0, "unchanged_chunks": 0, "added_chunks": 0,
+                      "deleted_chunks": 0, "failed_chunks": 0, "embedding_calls": 0}
+
+    def add(self, file_name: str, fingerprint: str, chunks: List[str]) -> None:
+        diff = diff_document_chunks(self.client, self.collection_name, file_name, chunks)
+        self.stats["unchanged_chunks"] += diff.unchanged
+        self.pending.extend((file_name, c) for c in diff.new_chunks)
+        self.pending_files.append((file_name, fingerprint, diff))
+        if len(self.pending) >= self.batch_points:
+            self.flush()
+
+    def flush(self, wait: bool = False) -> None:
+        upserted: Dict[str, int] = {}
+        if self.pending:
+            embeddings = embed_texts([text for _, (_, _, text) in self.pending])
+            self.stats["embedding_calls"] += math.ceil(len(self.pending) / EMBED_BATCH_SIZE)
+            points = []
+            for (file_name, chunk), vec in zip(self.pending, embeddings):
+                built = build_points(file_name, [chunk], [vec], self.metadata)
+                upserted[file_name] = upserted.get(file_name, 0) + len(built)
+                points.extend(built)
+            if points:
+                self.client.upsert(collection_name=self.collection_name, points=points, wait=wait)
+            self.stats["added_chunks"] += len(points)
+            self.pending = []
+
+        for file_name, fingerprint, diff in self.pending_files:
+            failed = len(diff.new_chunks) - upserted.get(file_name, 0)
+            if failed:
+                # Keep the old chunks and leave the file out of the checkpoint so the next run retries it
+                logger.warning("%d of %d new chunks of %s failed to embed; it will be retried on the next run",
+                               failed, len(diff.new_chunks), file_name)
+                self.stats["failed_chunks"] += failed
+                self.stats["failed_files"] += 1
+                continue
+            delete_points(self.client, self.collection_name, diff.stale_ids, wait=wait)
+            self.stats["deleted_chunks"] += len(diff.stale_ids)
+            self.checkpoint.write(json.dumps({"file": file_name, "fingerprint": fingerprint}) + "\n")
+            self.stats["files"] += 1
+        self.checkpoint.flush()
+        self.pending_files = []
+
+    def close(self) -> None:
+        # Earlier wait=False writes are already acknowledged by Qdrant; wait for the last batch to be applied
+        self.flush(wait=True)
+        self.checkpoint.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", type=Path, help="Directory tree or .zip archive")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--email", help="Ingest into this user's collection")
+    target.add_argument("--collection", help="Ingest into this collection name")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Parser processes")
+    parser.add_argument("--batch-points", type=int, default=1000, help="New chunks per embed+upsert flush")
+    parser.add_argument("--checkpoint", type=Path, help="Checkpoint file (default: .bulk_ingest_<collection>.jsonl)")
+    parser.add_argument("--chunk-size", type=int, default=settings.chunk_token_size)
+    parser.add_argument("--overlap", type=int, default=settings.chunk_overlap)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    collection_name = args.collection or sanitize_email_for_collection(args.email)
+    checkpoint_path = args.checkpoint or Path(f".bulk_ingest_{collection_name}.jsonl")
+    metadata = {"uploaded_at": datetime.utcnow().isoformat() + "Z"}
+    if args.email:
+        metadata["email"] = args.email
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as staging_dir:
+        files = collect_files(args.source, staging_dir)
+        done = load_checkpoint(checkpoint_path)
+        todo = [f for f in files if (f[1], f[2]) not in done]
+        print(f"{len(files)} files found, {len(files) - len(todo)} already ingested, {len(todo)} to go -> {collection_name}")
+
+        ensure_collection(_get_qdrant_client(prefer_grpc=False), collection_name)
+        ingester = BulkIngester(collection_name, checkpoint_path, args.batch_points, metadata)
+        fingerprints = {file_name: fingerprint for _, file_name, fingerprint in todo}
+        try:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                futures = {
+                    pool.submit(_parse_file, path, file_name, args.chunk_size, args.overlap): file_name
+                    for path, file_name, _ in todo
+                }
+                for future in as_completed(futures):
+                    try:
+                        file_name, chunks = future.result()
+                    except Exception:
+                        logger.exception("Failed to parse %s; it will be retried on the next run", futures[future])
+                        ingester.stats["failed_files"] += 1
+                        continue
+                    ingester.add(file_name, fingerprints[file_name], chunks)
+        finally:
+            ingester.close()
+
+    elapsed = time.perf_counter() - started
+    s = ingester.stats
+    chunks_total = s["added_chunks"] + s["unchanged_chunks"]
+    print(f"files:            {s['files']} ingested, {s['failed_files']} failed")
+    print(f"chunks:           {s['added_chunks']} added, {s['unchanged_chunks']} unchanged, {s['deleted_chunks']} deleted, "
+          f"{s['failed_chunks']} failed")
+    print(f"embedding calls:  {s['embedding_calls']}")
+    print(f"elapsed:          {elapsed:.1f}s")
+    print(f"throughput:       {s['files'] / elapsed:.2f} files/s, {chunks_total / elapsed:.1f} chunks/s")
+    return 1 if s["failed_files"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
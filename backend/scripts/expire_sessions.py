@@ -0,0 +1,69 @@
+"""
+Give session keys written before sliding expiry existed a TTL.
+
+Session history and summaries now get SESSION_TTL_SECONDS on every read/write (see app/rag/memory.py),
+but keys from abandoned sessions created earlier are never touched again and would live forever.
+This one-off pass SCANs the session keys and applies EXPIRE to those without a TTL (TTL == -1).
+
+Usage (from backend/):
+    python -m scripts.expire_sessions --dry-run
+    python -m scripts.expire_sessions --ttl 604800
+"""
+import argparse
+import logging
+import sys
+from typing import Dict, List
+import redis
+from app.core.config import settings
+from app.core.clients import get_redis
+from app.rag.memory import HISTORY_KEY_FMT, SUMMARY_KEY_FMT
+
+logger = logging.getLogger("scripts.expire_sessions")
+
+PATTERNS = [fmt.format(session_id="*") for fmt in (HISTORY_KEY_FMT, SUMMARY_KEY_FMT)]
+
+
+def _expire_batch(client: redis.Redis, keys: List, ttl: int, dry_run: bool) -> int:
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.ttl(key)
+    missing = [key for key, key_ttl in zip(keys, pipe.execute()) if key_ttl == -1]
+    if missing and not dry_run:
+        for key in missing:
+            pipe.expire(key, ttl)
+        pipe.execute()
+    return len(missing)
+
+
+def backfill_ttl(client: redis.Redis, ttl: int, dry_run: bool = False, batch: int = 500) -> Dict[str, int]:
+    """Sets ``ttl`` on every session key that has none; returns how many keys were scanned and expired."""
+    counts = {"scanned": 0, "expired": 0}
+    for pattern in PATTERNS:
+        keys = []
+        for key in client.scan_iter(match=pattern, count=1000):
+            keys.append(key)
+            if len(keys) >= batch:
+                counts["expired"] += _expire_batch(client, keys, ttl, dry_run)
+                counts["scanned"] += len(keys)
+                keys = []
+        if keys:
+            counts["expired"] += _expire_batch(client, keys, ttl, dry_run)
+            counts["scanned"] += len(keys)
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ttl", type=int, default=settings.session_ttl_seconds, help="Seconds to expire after")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the keys without a TTL")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    counts = backfill_ttl(get_redis(), args.ttl, dry_run=args.dry_run)
+    verb = "would expire" if args.dry_run else "expired"
+    print(f"{counts['scanned']} session keys scanned, {verb} {counts['expired']} without a TTL")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
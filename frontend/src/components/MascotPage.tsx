@@ -127,7 +127,7 @@ export default function MascotPage({ allDocs, onRefreshDocs, sessionsApi, showTo
       setEmotion(mapped)
 
       if (!muteTTS && text) {
-        const buf = await tts(text)
+        const buf = await tts(text, user!.email)
         pushMessage({ role: 'assistant', text })
 
         const audio = new Audio(URL.createObjectURL(new Blob([buf], { type: 'audio/wav' })))
@@ -55,11 +55,11 @@ export async function chat(message: string, sessionId: string, name: string, ema
   return res.json()
 }
 
-export async function tts(text: string, voice?: string) {
+export async function tts(text: string, email: string, voice?: string) {
   const res = await fetch(`${API_BASE}/tts`, {
     method: 'POST',
     headers: {'Content-Type':'application/json'},
-    body: JSON.stringify({ text, voice })
+    body: JSON.stringify({ text, email, voice })
   })
   if (!res.ok) throw new Error(await res.text())
   const buf = await res.arrayBuffer()
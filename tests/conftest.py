@@ -0,0 +1,14 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+# Settings requires these; unit tests never reach the real services
+for name, value in {
+    "GROQ_API_KEY": "test",
+    "GOOGLE_API_KEY": "test",
+    "QDRANT_URL": "http://localhost:6333",
+    "QDRANT_API_KEY": "test",
+    "REDIS_URL": "redis://localhost:6379/0",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,86 @@
+import pytest
+
+try:
+    from app.rag import adaptive
+except Exception as e:  # the tokenizer is downloaded on first use
+    pytest.skip(f"tiktoken encoding unavailable: {e}", allow_module_level=True)
+
+from app.core.resilience import LatencyTracker
+from app.rag.adaptive import LEVELS, choose_plan, record_generation, trim_contexts
+from app.rag.ingest import ENC
+
+
+@pytest.fixture(autouse=True)
+def latency(monkeypatch):
+    tracker = LatencyTracker()
+    monkeypatch.setattr(adaptive, "upstream_latency", tracker)
+    return tracker
+
+
+def _observe(latency, retrieval=0.1, generation=1.0, emotion=0.2, samples=20):
+    for _ in range(samples):
+        latency.record(adaptive.RETRIEVAL_UPSTREAM, retrieval)
+        latency.record(adaptive.EMOTION_UPSTREAM, emotion)
+        record_generation(generation, adaptive.FULL_MAX_TOKENS)
+
+
+def test_no_target_or_no_samples_keeps_the_full_plan(latency):
+    assert choose_plan(None, 6, False).level == 0
+    assert choose_plan(500, 6, False).level == 0
+    _observe(latency)
+    assert choose_plan(None, 6, False).level == 0
+
+
+@pytest.mark.parametrize("target_ms, level", [(2000, 0), (1200, 1), (900, 2), (700, 3), (100, 3)])
+def test_picks_the_least_degraded_plan_that_fits(latency, target_ms, level):
+    # Predicted: level 0 1.3s, level 1 1.15s, level 2 0.8s, level 3 ~0.69s
+    _observe(latency)
+    assert choose_plan(target_ms, 6, False).level == level
+
+
+def test_degraded_samples_do_not_flip_the_level(latency):
+    _observe(latency)
+    plan = choose_plan(900, 6, False)
+    assert plan.level == 2
+    # The upstream is as fast as before; answers capped at the degraded max_tokens just finish sooner
+    for _ in range(200):
+        record_generation(1.0 * adaptive.token_scale(plan.max_tokens), plan.max_tokens)
+    assert choose_plan(900, 6, False).level == 2
+
+
+def test_plan_never_exceeds_the_requested_top_k_or_drops_short_answer(latency):
+    _observe(latency)
+    plan = choose_plan(900, 2, True)
+    assert plan.top_k == 2
+    assert plan.short_answer
+    assert choose_plan(2000, 10, False).top_k == 10
+
+
+def _context(id, tokens):
+    return {"id": id, "source": id, "text": ENC.decode(ENC.encode(" word" * tokens)[:tokens])}
+
+
+def _tokens(ctx):
+    return len(ENC.encode(ctx["text"]))
+
+
+def test_trim_keeps_contexts_in_order_within_budget():
+    contexts = [_context(f"c{i}", 40) for i in range(4)]
+    kept = trim_contexts(contexts, 100)
+    assert [c["id"] for c in kept] == ["c0", "c1"]
+    assert trim_contexts(contexts, None) == contexts
+
+
+def test_trim_truncates_an_oversized_first_chunk():
+    kept = trim_contexts([_context("c0", 300), _context("c1", 10)], 100)
+    assert [c["id"] for c in kept] == ["c0"]
+    assert _tokens(kept[0]) <= 100
+
+
+def test_long_summary_cannot_use_up_the_budget_before_retrieved_chunks():
+    contexts = [_context("session_summary", 500)] + [_context(f"c{i}", 30) for i in range(4)]
+    kept = trim_contexts(contexts, LEVELS[3].context_token_budget)
+    assert kept[0]["id"] == "session_summary"
+    assert _tokens(kept[0]) <= LEVELS[3].context_token_budget * adaptive.SUMMARY_BUDGET_SHARE
+    assert [c["id"] for c in kept[1:]] == ["c0", "c1", "c2", "c3"]
+    assert sum(_tokens(c) for c in kept) <= LEVELS[3].context_token_budget
@@ -0,0 +1,114 @@
+import json
+import time
+from types import SimpleNamespace
+import pytest
+
+try:
+    from app import main
+except Exception as e:  # the tokenizer is downloaded on first use
+    pytest.skip(f"app.main unavailable: {e}", allow_module_level=True)
+
+from fastapi.testclient import TestClient
+
+EMAIL = "student@example.com"
+
+
+class FakeRetriever:
+    """Returns one doc per query naming the query and the first source document of its filter."""
+    calls = []
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def retrieve_batch(self, queries, top_k=8, filters=None, mmr=None):
+        FakeRetriever.calls.append({"queries": list(queries), "filters": filters, "top_k": top_k})
+        return [
+            [SimpleNamespace(id=f"{q}-doc", text=f"notes on {q}", source=flt.should[0].match.value)]
+            for q, flt in zip(queries, filters)
+        ]
+
+
+def fake_generate_answer(question, contexts, max_tokens=512, temperature=0.0, short_answer=False):
+    if question == "boom":
+        raise RuntimeError("generation failed")
+    # Earlier questions answer later, so completion order differs from input order
+    time.sleep(0.05 if question.startswith("q0") else 0.0)
+    return {"text": f" answer to {question} "}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    FakeRetriever.calls = []
+    monkeypatch.setattr(main, "QdrantRetriever", FakeRetriever)
+    monkeypatch.setattr(main, "generate_answer", fake_generate_answer)
+    monkeypatch.setattr(main, "_collection_exists", lambda name: True)
+    with TestClient(main.app) as client:
+        yield client
+    assert main._admission.snapshot()["active"] == 0
+
+
+def _batch(**overrides):
+    body = {
+        "email": EMAIL,
+        "questions": [
+            {"message": "q0 entropy", "source_documents": ["thermo.pdf"]},
+            {"message": "q1 no sources"},
+            {"message": "boom", "source_documents": ["laws.md"]},
+            {"message": "q3 enthalpy"},
+        ],
+        "source_documents": ["default.md"],
+    }
+    body.update(overrides)
+    return body
+
+
+def test_results_come_back_in_input_order_with_aligned_sources(client):
+    resp = client.post("/chat/batch", json=_batch())
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[0] == {"index": 0, "text": "answer to q0 entropy",
+                          "citations": [{"id": "q0 entropy-doc", "source": "thermo.pdf"}]}
+    # Questions without their own sources use the batch-level default
+    assert results[1]["citations"] == [{"id": "q1 no sources-doc", "source": "default.md"}]
+    assert results[3]["citations"] == [{"id": "q3 enthalpy-doc", "source": "default.md"}]
+
+    (call,) = FakeRetriever.calls
+    assert call["queries"] == ["q0 entropy", "q1 no sources", "boom", "q3 enthalpy"]
+    assert [f.should[0].match.value for f in call["filters"]] == ["thermo.pdf", "default.md", "laws.md", "default.md"]
+
+
+def test_one_failing_question_does_not_fail_the_batch(client):
+    results = client.post("/chat/batch", json=_batch()).json()["results"]
+    assert results[2]["text"] is None
+    assert results[2]["citations"] == []
+    assert "generation failed" in results[2]["error"]
+    assert all("error" not in r for i, r in enumerate(results) if i != 2)
+
+
+def test_questions_without_any_sources_get_no_retrieval(client):
+    body = _batch(source_documents=None, questions=[{"message": "q1 no sources"}])
+    results = client.post("/chat/batch", json=body).json()["results"]
+    assert results == [{"index": 0, "text": "answer to q1 no sources", "citations": []}]
+    assert FakeRetriever.calls == []
+
+
+def test_stream_emits_one_ndjson_line_per_question_with_its_index(client):
+    with client.stream("POST", "/chat/batch", json=_batch(stream=True)) as resp:
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in resp.iter_lines() if line]
+    by_index = {r["index"]: r for r in lines}
+    assert sorted(by_index) == [0, 1, 2, 3]
+    assert by_index[0]["text"] == "answer to q0 entropy"
+    assert by_index[3]["text"] == "answer to q3 enthalpy"
+    assert "error" in by_index[2]
+    # The slow first question streams after the others instead of holding them back
+    assert lines[-1]["index"] == 0
+    assert main._admission.snapshot()["active"] == 0
+
+
+def test_batch_validation(client):
+    assert client.post("/chat/batch", json=_batch(questions=[])).status_code == 400
+    too_many = [{"message": "q"}] * (main.settings.chat_batch_max_questions + 1)
+    assert client.post("/chat/batch", json=_batch(questions=too_many)).status_code == 400
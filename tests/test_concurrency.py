@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+
+from app.core.concurrency import AdmissionController, Overloaded, SingleFlight
+
+
+def _controller(**overrides):
+    options = dict(per_key_limit=4, global_limit=64, max_queue=5, queue_timeout=0.2, retry_after=1.0)
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+async def _request(admission, key, outcomes, hold=0.05):
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        async with admission.admit(key):
+            outcomes.append(("admitted", loop.time() - started))
+            await asyncio.sleep(hold)
+    except Overloaded as e:
+        outcomes.append((e.reason, loop.time() - started))
+
+
+def test_burst_in_one_tick_respects_limit_and_queue_bound():
+    admission = _controller()
+    outcomes = []
+
+    async def burst():
+        await asyncio.gather(*(_request(admission, "user", outcomes, hold=0.5) for _ in range(200)))
+
+    asyncio.run(burst())
+    by_reason = {}
+    for reason, _ in outcomes:
+        by_reason[reason] = by_reason.get(reason, 0) + 1
+    # 4 run, 5 wait in the queue (and time out behind the long holders), everything else is rejected at once
+    assert by_reason == {"admitted": 4, "timed out waiting for a free slot": 5, "request queue is full": 191}
+    assert all(elapsed < 0.05 for reason, elapsed in outcomes if reason == "request queue is full")
+    assert admission.snapshot() == {"active": 0, "waiting": 0, "admitted": 4, "rejected": 191, "timed_out": 5}
+
+
+def test_queued_requests_are_admitted_when_slots_free_up():
+    admission = _controller(per_key_limit=2, max_queue=3, queue_timeout=1.0)
+    outcomes = []
+
+    async def run():
+        await asyncio.gather(*(_request(admission, "user", outcomes, hold=0.02) for _ in range(5)))
+
+    asyncio.run(run())
+    assert [reason for reason, _ in outcomes] == ["admitted"] * 5
+    assert admission.snapshot()["active"] == 0
+
+
+def test_per_key_limit_does_not_block_other_keys():
+    admission = _controller(per_key_limit=1, global_limit=2, max_queue=0)
+
+    async def run():
+        async with admission.admit("a"):
+            with pytest.raises(Overloaded):
+                async with admission.admit("a"):
+                    pass
+            async with admission.admit("b"):
+                with pytest.raises(Overloaded):
+                    async with admission.admit("c"):
+                        pass
+
+    asyncio.run(run())
+
+
+def test_anonymous_callers_only_count_against_the_global_limit():
+    admission = _controller(per_key_limit=1, global_limit=3, max_queue=0)
+
+    async def run():
+        async with admission.admit(None), admission.admit(None), admission.admit("user"):
+            assert admission.snapshot()["active"] == 3
+            with pytest.raises(Overloaded):
+                async with admission.admit(None):
+                    pass
+        assert admission.snapshot()["active"] == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    admission = _controller(per_key_limit=1, max_queue=1, queue_timeout=5.0)
+
+    async def run():
+        async with admission.admit("user"):
+            waiter = asyncio.ensure_future(admission.acquire("user"))
+            await asyncio.sleep(0)
+            assert admission.snapshot()["waiting"] == 1
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            assert admission.snapshot()["waiting"] == 0
+        assert admission.snapshot()["active"] == 0
+
+    asyncio.run(run())
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def slow_answer():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("q", slow_answer) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["answer"] * 10
+    assert len(calls) == 1
+    assert flight.stats == {"calls": 1, "coalesced": 9}
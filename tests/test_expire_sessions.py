@@ -0,0 +1,67 @@
+import fnmatch
+
+from scripts.expire_sessions import backfill_ttl
+
+
+class TTLStore:
+    """Keys with TTLs (-1 = none) and the SCAN/TTL/EXPIRE commands the backfill uses."""
+
+    def __init__(self, ttls):
+        self.ttls = dict(ttls)
+
+    def scan_iter(self, match, count=None):
+        return [key for key in list(self.ttls) if fnmatch.fnmatchcase(key, match)]
+
+    def pipeline(self, transaction=True):
+        return Pipeline(self)
+
+
+class Pipeline:
+    def __init__(self, store):
+        self.store = store
+        self.ops = []
+
+    def ttl(self, key):
+        self.ops.append(lambda: self.store.ttls[key])
+
+    def expire(self, key, seconds):
+        def op():
+            self.store.ttls[key] = seconds
+            return True
+        self.ops.append(op)
+
+    def execute(self):
+        results = [op() for op in self.ops]
+        self.ops = []
+        return results
+
+
+def _store():
+    return TTLStore({
+        "session:old:history": -1,
+        "session:old:summary": -1,
+        "session:live:history": 3600,
+        "session:live:summary": 3600,
+        "session:other:lock": -1,
+        "unrelated": -1,
+    })
+
+
+def test_backfill_sets_ttl_only_on_session_keys_without_one():
+    store = _store()
+    counts = backfill_ttl(store, ttl=86400, batch=1)
+    assert counts == {"scanned": 4, "expired": 2}
+    assert store.ttls == {
+        "session:old:history": 86400,
+        "session:old:summary": 86400,
+        "session:live:history": 3600,
+        "session:live:summary": 3600,
+        "session:other:lock": -1,
+        "unrelated": -1,
+    }
+
+
+def test_dry_run_changes_nothing():
+    store = _store()
+    assert backfill_ttl(store, ttl=86400, dry_run=True) == {"scanned": 4, "expired": 2}
+    assert store.ttls == _store().ttls
@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+import pytest
+
+try:
+    from app.rag import ingest
+except Exception as e:  # the tokenizer is downloaded on first use
+    pytest.skip(f"tiktoken encoding unavailable: {e}", allow_module_level=True)
+
+from app.rag.ingest import _chunk_hash, _point_id, build_points, diff_document_chunks, sync_document_chunks
+
+COLLECTION = "ai_tutor_test"
+DIM = 4
+
+
+class PointStore:
+    """The scroll/upsert/delete subset of QdrantClient used by incremental ingestion, kept in memory."""
+
+    def __init__(self):
+        self.points = {}
+        self.deleted = []
+
+    def add(self, point_id, file_name, chunk_hash=None):
+        payload = {"file_name": file_name}
+        if chunk_hash:
+            payload["chunk_hash"] = chunk_hash
+        self.points[point_id] = SimpleNamespace(id=point_id, payload=payload)
+
+    def scroll(self, collection_name, scroll_filter, limit, offset=None, with_payload=None, with_vectors=False):
+        file_name = scroll_filter.must[0].match.value
+        return [p for p in self.points.values() if p.payload["file_name"] == file_name], None
+
+    def upsert(self, collection_name, points, wait=True):
+        for p in points:
+            self.points[p.id] = SimpleNamespace(id=p.id, payload=p.payload)
+
+    def delete(self, collection_name, points_selector, wait=True):
+        for point_id in points_selector.points:
+            self.deleted.append(point_id)
+            self.points.pop(point_id, None)
+
+
+def _store_chunks(store, file_name, chunks):
+    for chunk in chunks:
+        h = _chunk_hash(chunk)
+        store.add(_point_id(file_name, h), file_name, h)
+
+
+@pytest.fixture
+def store():
+    return PointStore()
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    """Embeds every text as a unit vector, except texts listed in ``failing`` (zero vector, like a failed batch)."""
+    state = SimpleNamespace(calls=[], failing=set())
+
+    def embed_texts(texts):
+        texts = list(texts)
+        state.calls.append(texts)
+        return [[0.0] * DIM if t in state.failing else [1.0] + [0.0] * (DIM - 1) for t in texts]
+
+    monkeypatch.setattr(ingest, "embed_texts", embed_texts)
+    return state
+
+
+def test_diff_finds_new_and_stale_chunks_and_dedups_repeats(store):
+    _store_chunks(store, "notes.md", ["kept", "removed"])
+    diff = diff_document_chunks(store, COLLECTION, "notes.md", ["kept", "added", "added", "   "])
+    assert [(h, idx, text) for h, idx, text in diff.new_chunks] == [(_chunk_hash("added"), 1, "added")]
+    assert diff.stale_ids == [_point_id("notes.md", _chunk_hash("removed"))]
+    assert diff.unchanged == 1
+
+
+def test_diff_treats_points_without_hash_as_stale(store):
+    store.add("legacy-1", "notes.md")
+    store.add("legacy-2", "notes.md")
+    diff = diff_document_chunks(store, COLLECTION, "notes.md", ["fresh"])
+    assert sorted(diff.stale_ids) == ["legacy-1", "legacy-2"]
+    assert diff.unchanged == 0
+
+
+def test_diff_only_looks_at_the_same_file(store):
+    _store_chunks(store, "other.md", ["shared"])
+    diff = diff_document_chunks(store, COLLECTION, "notes.md", ["shared"])
+    assert len(diff.new_chunks) == 1
+    assert diff.stale_ids == []
+
+
+def test_build_points_skips_zero_vectors():
+    new_chunks = [(_chunk_hash("a"), 0, "a"), (_chunk_hash("b"), 1, "b")]
+    points = build_points("notes.md", new_chunks, [[0.0] * DIM, [1.0] * DIM], {"email": "x@example.com"})
+    assert [p.id for p in points] == [_point_id("notes.md", _chunk_hash("b"))]
+    assert points[0].payload["chunk_index"] == 1
+    assert points[0].payload["email"] == "x@example.com"
+
+
+def test_sync_embeds_only_new_chunks_and_deletes_stale(store, embeddings):
+    _store_chunks(store, "notes.md", ["kept", "removed"])
+    counts = sync_document_chunks(store, COLLECTION, "notes.md", ["kept", "added"])
+    assert counts == {"unchanged_chunks": 1, "added_chunks": 1, "deleted_chunks": 1, "failed_chunks": 0}
+    assert embeddings.calls == [["added"]]
+    assert store.deleted == [_point_id("notes.md", _chunk_hash("removed"))]
+    assert {p.payload["chunk_hash"] for p in store.points.values()} == {_chunk_hash("kept"), _chunk_hash("added")}
+
+
+def test_sync_of_unchanged_document_embeds_nothing(store, embeddings):
+    _store_chunks(store, "notes.md", ["a", "b"])
+    counts = sync_document_chunks(store, COLLECTION, "notes.md", ["a", "b"])
+    assert counts == {"unchanged_chunks": 2, "added_chunks": 0, "deleted_chunks": 0, "failed_chunks": 0}
+    assert embeddings.calls == []
+
+
+def test_sync_keeps_stale_chunks_when_a_new_chunk_fails(store, embeddings):
+    _store_chunks(store, "notes.md", ["old"])
+    embeddings.failing = {"broken"}
+    counts = sync_document_chunks(store, COLLECTION, "notes.md", ["fine", "broken"])
+    assert counts == {"unchanged_chunks": 0, "added_chunks": 1, "deleted_chunks": 0, "failed_chunks": 1}
+    assert store.deleted == []
+    assert _point_id("notes.md", _chunk_hash("old")) in store.points
+
+    # The next run retries the failed chunk and then prunes the stale one
+    embeddings.failing = set()
+    counts = sync_document_chunks(store, COLLECTION, "notes.md", ["fine", "broken"])
+    assert counts == {"unchanged_chunks": 1, "added_chunks": 1, "deleted_chunks": 1, "failed_chunks": 0}
+    assert store.deleted == [_point_id("notes.md", _chunk_hash("old"))]
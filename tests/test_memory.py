@@ -0,0 +1,115 @@
+import json
+import pytest
+
+from app.core.config import settings
+from app.rag import memory
+from app.rag.memory import FLAG_COMPRESSED, decode_turn, encode_turn
+
+
+class ListStore:
+    """The handful of Redis list commands the session store uses, kept in memory."""
+
+    def __init__(self):
+        self.lists = {}
+        self.lrange_calls = []
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+
+    def ltrim(self, key, start, end):
+        items = self.lists.get(key, [])
+        self.lists[key] = items[start:end + 1 if end != -1 else None]
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        return []
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def lrange(self, key, start, end):
+        self.lrange_calls.append((start, end))
+        return self.lists.get(key, [])[start:end + 1 if end != -1 else None]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = ListStore()
+    monkeypatch.setattr(memory, "get_redis", lambda: store)
+    return store
+
+
+@pytest.mark.parametrize("role", ["user", "assistant", "system"])
+def test_short_turn_round_trips_uncompressed(role):
+    raw = encode_turn(role, "What is a derivative? ∂")
+    assert not raw[0] & FLAG_COMPRESSED
+    assert decode_turn(raw) == {"role": role, "text": "What is a derivative? ∂"}
+
+
+def test_long_turn_is_compressed_and_round_trips():
+    text = "The derivative measures the rate of change. " * 50
+    raw = encode_turn("assistant", text)
+    assert raw[0] & FLAG_COMPRESSED
+    assert len(raw) < len(text.encode("utf-8"))
+    assert decode_turn(raw) == {"role": "assistant", "text": text}
+
+
+def test_turn_is_stored_raw_when_compression_does_not_help(monkeypatch):
+    monkeypatch.setattr(settings, "session_compress_min_bytes", 1)
+    raw = encode_turn("user", "ok")
+    assert raw == bytes([memory.ROLE_CODES["user"]]) + b"ok"
+    assert decode_turn(raw) == {"role": "user", "text": "ok"}
+
+
+def test_unknown_role_falls_back_to_json():
+    raw = encode_turn("tool", "42")
+    assert json.loads(raw) == {"role": "tool", "text": "42"}
+    assert decode_turn(raw) == {"role": "tool", "text": "42"}
+
+
+def test_legacy_json_entries_are_still_readable():
+    legacy = json.dumps({"role": "user", "text": "hello"}).encode("utf-8")
+    assert decode_turn(legacy) == {"role": "user", "text": "hello"}
+
+
+def test_history_window_reads_only_the_last_turns(store):
+    for i in range(10):
+        memory.append_turn("s1", "user" if i % 2 == 0 else "assistant", f"turn {i}")
+
+    assert [t["text"] for t in memory.get_history("s1", last_n=3)] == ["turn 7", "turn 8", "turn 9"]
+    assert store.lrange_calls[-1] == (-3, -1)
+    assert len(memory.get_history("s1")) == 10
+    assert memory.get_history("s1", last_n=0) == []
+
+
+def test_history_is_capped_at_max_turns(store, monkeypatch):
+    monkeypatch.setattr(settings, "session_max_turns", 4)
+    for i in range(6):
+        memory.append_turn("s2", "user", f"turn {i}")
+    assert [t["text"] for t in memory.get_history("s2")] == ["turn 2", "turn 3", "turn 4", "turn 5"]
+
+
+def test_failed_summary_is_tried_once_and_counts_against_the_chat_breaker(store, monkeypatch):
+    calls = []
+
+    class Unavailable(Exception):
+        status_code = 503
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        raise Unavailable()
+
+    monkeypatch.setattr(memory.client.chat.completions, "create", create)
+    for i in range(4):
+        memory.append_turn("s3", "user", f"turn {i}")
+    failures = memory.resilience.get_breaker("groq_chat").snapshot()["failures"]
+
+    memory.update_summary_if_needed("s3", threshold_turns=4)
+    assert len(calls) == 1
+    assert calls[0]["timeout"] > 0
+    assert memory.resilience.get_breaker("groq_chat").snapshot()["failures"] == failures + 1
@@ -0,0 +1,64 @@
+import numpy as np
+
+from app.rag.mmr import mmr_select
+
+
+def _unit(v):
+    v = np.asarray(v, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def _near_duplicate_corpus():
+    # Three near-identical chunks closest to the query, then two distinct but still relevant ones
+    query = _unit([1.0, 0.0, 0.0])
+    docs = [
+        _unit([0.95, 0.31, 0.0]),
+        _unit([0.95, 0.30, 0.01]),
+        _unit([0.94, 0.32, 0.0]),
+        _unit([0.80, -0.40, 0.45]),
+        _unit([0.75, 0.0, -0.66]),
+    ]
+    return query, docs
+
+
+def test_mmr_lambda_one_is_relevance_order():
+    query, docs = _near_duplicate_corpus()
+    relevance = np.stack(docs) @ query
+    expected = list(np.argsort(-relevance)[:3])
+    assert mmr_select(query, docs, top_k=3, lambda_mult=1.0) == expected
+
+
+def test_mmr_skips_near_duplicates():
+    query, docs = _near_duplicate_corpus()
+    selected = mmr_select(query, docs, top_k=3, lambda_mult=0.5)
+    assert selected[0] == int(np.argmax(np.stack(docs) @ query))
+    # Only one of the three near-duplicates should survive
+    assert len(set(selected) & {0, 1, 2}) == 1
+    assert {3, 4} <= set(selected)
+
+
+def test_mmr_trade_off_is_monotonic():
+    rng = np.random.default_rng(0)
+    query = _unit(rng.normal(size=32))
+    docs = [_unit(query + 0.6 * rng.normal(size=32)) for _ in range(40)]
+    matrix = np.stack(docs)
+
+    def relevance_and_redundancy(lam):
+        idx = mmr_select(query, docs, top_k=6, lambda_mult=lam)
+        chosen = matrix[idx]
+        sims = chosen @ chosen.T
+        redundancy = sims[np.triu_indices(len(idx), k=1)].mean()
+        return float((chosen @ query).mean()), float(redundancy)
+
+    rel_hi, red_hi = relevance_and_redundancy(1.0)
+    rel_lo, red_lo = relevance_and_redundancy(0.2)
+    assert rel_hi >= rel_lo
+    assert red_lo <= red_hi
+
+
+def test_mmr_edge_cases():
+    query = _unit([1.0, 0.0])
+    assert mmr_select(query, [], top_k=3) == []
+    assert mmr_select(query, [_unit([1.0, 0.0])], top_k=0) == []
+    result = mmr_select(query, [_unit([1.0, 0.0]), _unit([0.0, 1.0])], top_k=5)
+    assert sorted(result) == [0, 1]
@@ -0,0 +1,118 @@
+import time
+import pytest
+
+from app.core import resilience
+from app.core.config import settings
+from app.core.resilience import CircuitBreaker, UpstreamUnavailable
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "upstream_backoff_base", 0.001)
+    monkeypatch.setattr(settings, "upstream_backoff_max", 0.001)
+
+
+def test_breaker_opens_after_threshold_and_recovers_through_half_open():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot()["short_circuited"] == 1
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe is let through while half-open
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()["consecutive_failures"] == 0
+
+
+def test_failed_half_open_probe_reopens_the_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=0.05)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.snapshot()["opened"] == 2
+
+
+@pytest.mark.parametrize("exc, retryable", [
+    (StatusError(400), False),
+    (StatusError(401), False),
+    (StatusError(404), False),
+    (StatusError(408), True),
+    (StatusError(429), True),
+    (StatusError(500), True),
+    (StatusError(503), True),
+    (TimeoutError(), True),
+    (ConnectionError(), True),
+    (ValueError("bad input"), False),
+    (UpstreamUnavailable("x", "circuit open"), False),
+])
+def test_is_retryable(exc, retryable):
+    assert resilience.is_retryable(exc) is retryable
+
+
+def test_call_raises_client_errors_without_retrying_or_tripping_the_breaker():
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        resilience.call("test_4xx", bad_request, attempts=3)
+    assert len(calls) == 1
+    snapshot = resilience.get_breaker("test_4xx").snapshot()
+    assert snapshot["state"] == CircuitBreaker.CLOSED
+    assert snapshot["failures"] == 0
+
+
+def test_call_retries_transient_errors():
+    results = iter([StatusError(503), StatusError(429), "ok"])
+
+    def flaky():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert resilience.call("test_flaky", flaky, attempts=3) == "ok"
+    assert resilience.get_breaker("test_flaky").snapshot()["failures"] == 2
+
+
+def test_hedge_answers_when_the_primary_is_slow():
+    calls = []
+
+    def sometimes_slow():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return "primary"
+        return "hedge"
+
+    started = time.monotonic()
+    assert resilience.call("test_hedge", sometimes_slow, attempts=1, hedge_after=0.05) == "hedge"
+    assert time.monotonic() - started < 0.4
+
+
+def test_hedged_call_past_the_deadline_is_upstream_unavailable():
+    def slow():
+        time.sleep(0.3)
+
+    with resilience.deadline(0.1), pytest.raises(UpstreamUnavailable):
+        resilience.call("test_deadline", slow, attempts=1, hedge_after=0.05)
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+from app.rag import retriever as retriever_module
+from app.rag.retriever import QdrantRetriever
+
+if not hasattr(retriever_module.models, "SearchRequest"):
+    pytest.skip("installed qdrant-client no longer has the search_batch API", allow_module_level=True)
+
+DIM = 8
+QUERIES = ["what is entropy", "define enthalpy", "state the first law"]
+
+
+class BatchSearchClient:
+    """Answers each batched search with one hit naming the query (by its one-hot vector) and its filter."""
+
+    def __init__(self):
+        self.requests = []
+
+    def search_batch(self, collection_name, requests):
+        self.requests = requests
+        results = []
+        for req in requests:
+            query = QUERIES[int(np.argmax(req.vector))]
+            file_name = req.filter.should[0].match.value if req.filter else "any"
+            payload = {"text": f"hit for {query}", "file_name": file_name}
+            results.append([SimpleNamespace(id=f"{query}/{file_name}", score=0.9, payload=payload, vector=None)])
+        return results
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = BatchSearchClient()
+    monkeypatch.setattr(retriever_module, "get_qdrant_client", lambda: client)
+
+    def embed_content(model, content, task_type, output_dimensionality):
+        return {"embedding": [np.eye(DIM)[QUERIES.index(q)] * 3.0 for q in content]}
+
+    monkeypatch.setattr(retriever_module.genai, "embed_content", embed_content)
+    return client
+
+
+def _file_filter(name):
+    return retriever_module.models.Filter(should=[
+        retriever_module.models.FieldCondition(key="file_name", match=retriever_module.models.MatchValue(value=name))
+    ])
+
+
+def test_retrieve_batch_keeps_results_and_filters_aligned_with_queries(client):
+    r = QdrantRetriever(collection="ai_tutor_test")
+    filters = [_file_filter("thermo.pdf"), None, _file_filter("laws.md")]
+    results = r.retrieve_batch(QUERIES, top_k=3, filters=filters, mmr=False)
+
+    assert [[(d.text, d.source) for d in docs] for docs in results] == [
+        [("hit for what is entropy", "thermo.pdf")],
+        [("hit for define enthalpy", "any")],
+        [("hit for state the first law", "laws.md")],
+    ]
+    assert [req.limit for req in client.requests] == [3, 3, 3]
+    # Query embeddings are normalized before searching
+    assert all(np.isclose(np.linalg.norm(req.vector), 1.0) for req in client.requests)
+
+
+def test_retrieve_batch_rejects_misaligned_filters(client):
+    r = QdrantRetriever(collection="ai_tutor_test")
+    with pytest.raises(ValueError):
+        r.retrieve_batch(QUERIES, filters=[None])
+    assert r.retrieve_batch([]) == []